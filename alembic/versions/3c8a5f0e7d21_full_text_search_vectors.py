@@ -0,0 +1,59 @@
+"""Full text search vectors
+
+Revision ID: 3c8a5f0e7d21
+Revises: 9e4f1a6d2b87
+Create Date: 2026-10-18 12:40:51.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c8a5f0e7d21'
+down_revision: Union[str, None] = '9e4f1a6d2b87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must stay in sync with SEARCH_CONFIG and the weights in app.utils.search
+POST_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+COMMENT_VECTOR = "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+
+
+def upgrade() -> None:
+    # Stored generated columns (PostgreSQL 12+) keep themselves up to date on every
+    # insert and update; adding one rewrites the table once.
+    op.add_column(
+        'posts',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(POST_VECTOR, persisted=True)),
+    )
+    op.add_column(
+        'comments',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(COMMENT_VECTOR, persisted=True)),
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_posts_search_vector', 'posts', ['search_vector'], unique=False,
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_comments_search_vector', 'comments', ['search_vector'], unique=False,
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_comments_search_vector', table_name='comments', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_posts_search_vector', table_name='posts', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('comments', 'search_vector')
+    op.drop_column('posts', 'search_vector')
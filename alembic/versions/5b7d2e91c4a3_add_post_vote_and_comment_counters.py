@@ -0,0 +1,35 @@
+"""Add post vote and comment counters
+
+Revision ID: 5b7d2e91c4a3
+Revises: c300b4eb59fd
+Create Date: 2026-10-18 09:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7d2e91c4a3'
+down_revision: Union[str, None] = 'c300b4eb59fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('vote_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('posts', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        """
+        UPDATE posts SET
+            vote_count = (SELECT count(*) FROM votes WHERE votes.post_id = posts.id),
+            comment_count = (SELECT count(*) FROM comments WHERE comments.post_id = posts.id)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'comment_count')
+    op.drop_column('posts', 'vote_count')
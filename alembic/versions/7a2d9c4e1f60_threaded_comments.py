@@ -0,0 +1,66 @@
+"""Threaded comments
+
+Revision ID: 7a2d9c4e1f60
+Revises: 3c8a5f0e7d21
+Create Date: 2026-10-18 16:12:44.508127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2d9c4e1f60'
+down_revision: Union[str, None] = '3c8a5f0e7d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must stay in sync with PATH_WIDTH in app.utils.threads
+PATH_WIDTH = 10
+
+
+def upgrade() -> None:
+    op.add_column('comments', sa.Column('parent_id', sa.Integer(), nullable=True))
+    op.add_column('comments', sa.Column('root_id', sa.Integer(), nullable=True))
+    op.add_column('comments', sa.Column('path', sa.Text(), server_default='', nullable=False))
+    op.add_column('comments', sa.Column('depth', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('comments', sa.Column('reply_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_foreign_key(
+        'comments_parent_id_fkey', 'comments', 'comments', ['parent_id'], ['id'], ondelete='CASCADE'
+    )
+
+    # every existing comment becomes the top of its own thread
+    op.execute(f"UPDATE comments SET root_id = id, path = lpad(id::text, {PATH_WIDTH}, '0')")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_comments_parent_id', 'comments', ['parent_id'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_comments_root_id_path', 'comments', ['root_id', 'path'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_comments_post_id_roots', 'comments',
+            ['post_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False,
+            postgresql_where=sa.text('parent_id IS NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in ('ix_comments_post_id_roots', 'ix_comments_root_id_path', 'ix_comments_parent_id'):
+            op.drop_index(name, table_name='comments', postgresql_concurrently=True, if_exists=True)
+
+    # replies outlive their thread as top level comments
+    op.drop_constraint('comments_parent_id_fkey', 'comments', type_='foreignkey')
+    op.drop_column('comments', 'reply_count')
+    op.drop_column('comments', 'depth')
+    op.drop_column('comments', 'path')
+    op.drop_column('comments', 'root_id')
+    op.drop_column('comments', 'parent_id')
@@ -0,0 +1,63 @@
+"""Composite indexes for list queries
+
+Revision ID: 9e4f1a6d2b87
+Revises: 5b7d2e91c4a3
+Create Date: 2026-10-18 11:02:17.304519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4f1a6d2b87'
+down_revision: Union[str, None] = '5b7d2e91c4a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Each index matches a router query's filter and ORDER BY, ending in id so the
+# keyset cursors in app.utils.pagination can seek on it.
+COMPOSITE_INDEXES = [
+    ('ix_posts_author_id_updated_at_id', 'posts', ['author_id', sa.text('updated_at DESC'), sa.text('id DESC')]),
+    ('ix_posts_updated_at_id', 'posts', [sa.text('updated_at DESC'), sa.text('id DESC')]),
+    ('ix_comments_post_id_created_at_id', 'comments', ['post_id', sa.text('created_at DESC'), sa.text('id DESC')]),
+    ('ix_users_created_at_id', 'users', [sa.text('created_at DESC'), sa.text('id DESC')]),
+]
+
+# Primary keys are already indexed, and the composites above (or the unique
+# (post_id, user_id) vote constraint) lead with the remaining columns.
+REDUNDANT_INDEXES = [
+    ('ix_users_id', 'users', ['id']),
+    ('ix_posts_id', 'posts', ['id']),
+    ('ix_comments_id', 'comments', ['id']),
+    ('ix_votes_id', 'votes', ['id']),
+    ('ix_posts_author_id', 'posts', ['author_id']),
+    ('ix_comments_post_id', 'comments', ['post_id']),
+    ('ix_votes_post_id', 'votes', ['post_id']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in COMPOSITE_INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+        for name, table, columns in REDUNDANT_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REDUNDANT_INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+        for name, table, columns in COMPOSITE_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""User deleted_at for background purges
+
+Revision ID: d41b8e2f6a93
+Revises: 7a2d9c4e1f60
+Create Date: 2026-10-18 19:40:12.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41b8e2f6a93'
+down_revision: Union[str, None] = '7a2d9c4e1f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    # only users still being purged are indexed, which is what startup looks for
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_deleted_at', 'users', ['deleted_at'], unique=False,
+            postgresql_where=sa.text('deleted_at IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_users_deleted_at', table_name='users', postgresql_concurrently=True, if_exists=True
+        )
+    op.drop_column('users', 'deleted_at')
@@ -0,0 +1,33 @@
+"""Index posts.created_at for the hot feed window
+
+Revision ID: e8a3f61c9b24
+Revises: d41b8e2f6a93
+Create Date: 2026-10-18 21:05:37.640192
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a3f61c9b24'
+down_revision: Union[str, None] = 'd41b8e2f6a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_posts_created_at', 'posts', ['created_at'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_posts_created_at', table_name='posts', postgresql_concurrently=True, if_exists=True
+        )
@@ -1,17 +1,324 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+import asyncio
+import logging
+import time
+import uuid
 
-from .config import DATABASE_URL
+from fastapi import HTTPException
+from sqlalchemy import DateTime, event, exc, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from .config import (
+    ASYNC_DATABASE_URL,
+    DATABASE_REPLICA_URLS,
+    DB_MAX_IN_FLIGHT,
+    DB_MAX_OVERFLOW,
+    DB_POOL_MODE,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_REPLICA_CHECK_INTERVAL,
+    DB_REPLICA_CHECK_TIMEOUT,
+    DB_RETRY_AFTER,
+    DB_STATEMENT_TIMEOUT_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """
+    Counters describing how this worker's connection pool is being used.
+    """
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.waits += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+pool_stats = PoolStats()
+
+
+class DatabaseGate:
+    """
+    Caps the requests holding a database session in this worker.
+
+    Past ``limit`` a request is answered with a 503 and Retry-After straight away,
+    so an overload sheds load instead of piling up on pool timeouts.
+    """
+
+    def __init__(self, limit: int, retry_after: int):
+        self.limit = limit
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.rejected = 0
+
+    def acquire(self):
+        if self.limit and self.in_flight >= self.limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="The database is busy, retry shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+
+
+db_gate = DatabaseGate(DB_MAX_IN_FLIGHT, DB_RETRY_AFTER)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited for a connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - start)
+
+
+def _engine_options(url: str) -> dict:
+    driver = make_url(url).get_driver_name()
+    connect_args = {}
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "connect_args": connect_args}
+
+    if DB_POOL_MODE == "null":
+        options["poolclass"] = NullPool
+        if driver == "asyncpg":
+            # PgBouncer in transaction mode may run each statement on a different
+            # server connection, so prepared statements must not be cached or reused.
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    else:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+
+    if DB_STATEMENT_TIMEOUT_MS and driver == "asyncpg":
+        connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+    return options
+
+
+SessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+# SQLite keeps datetimes as text and compares them as strings, so every value is
+# stored the way its CURRENT_TIMESTAMP (func.now()) writes them, without fractions
+# of a second: a datetime bound in a query then compares like the stored defaults.
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
+_engine = None
+
+
+def get_engine():
+    """
+    Returns the process' engine, creating it on first use.
+
+    Nothing connects to the database, or imports the driver, until the first
+    session is needed, so importing the app stays cheap. SessionLocal is bound to
+    the engine here.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+        _listen(_engine.sync_engine)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+async def dispose_engine():
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+
+
+class ReplicaSet:
+    """
+    The read replicas, their engines created on first use.
+
+    Reads rotate over the healthy replicas. One that fails a query is taken out
+    of the rotation straight away and put back once the periodic SELECT 1 passes.
+    """
+
+    def __init__(self, urls: list, check_interval: float, check_timeout: float):
+        self.urls = urls
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.primary_reads = 0
+        self.replica_reads = 0
+        self.failures = 0
+        self._engines = []
+        self._healthy = []
+        self._next = 0
+        self._task = None
+
+    @property
+    def engines(self) -> list:
+        if self.urls and not self._engines:
+            for url in self.urls:
+                options = _engine_options(url)
+                if options.get("poolclass") is InstrumentedQueuePool:
+                    # pool_stats describes the primary's pool
+                    options["poolclass"] = AsyncAdaptedQueuePool
+                self._engines.append(create_async_engine(url, **options))
+            self._healthy = list(self._engines)
+        return self._engines
+
+    def is_healthy(self, engine) -> bool:
+        return engine in self._healthy
+
+    def choose(self):
+        """
+        The next healthy replica engine, or None to read from the primary.
+        """
+        healthy = self._healthy if self.engines else []
+        if not healthy:
+            return None
+        self._next = (self._next + 1) % len(healthy)
+        return healthy[self._next]
+
+    def mark_down(self, engine):
+        if engine in self._healthy:
+            self.failures += 1
+            self._healthy = [e for e in self._healthy if e is not engine]
+            logger.warning("replica %s left the read rotation", engine.url.render_as_string())
+
+    async def _ping(self, engine) -> bool:
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    async def check(self):
+        results = await asyncio.gather(*(self._ping(engine) for engine in self.engines))
+        for engine, ok in zip(self.engines, results):
+            if not ok:
+                self.mark_down(engine)
+            elif engine not in self._healthy:
+                logger.info("replica %s rejoined the read rotation", engine.url.render_as_string())
+        self._healthy = [engine for engine, ok in zip(self.engines, results) if ok]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check()
+
+    def start(self):
+        if self.urls and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for engine in self._engines:
+            await engine.dispose()
+        self._engines, self._healthy = [], []
+
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS, DB_REPLICA_CHECK_INTERVAL, DB_REPLICA_CHECK_TIMEOUT)
+
+
+def _listen(sync_engine):
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_stats.connects += 1
+        if sync_engine.dialect.name == "sqlite":
+            # SQLite only enforces foreign keys, and their ON DELETE rules, when asked to
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_stats.checkouts += 1
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        pool_stats.checkins += 1
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_stats.invalidations += 1
+
+
+def pool_status() -> dict:
+    """
+    Returns a snapshot of the pool gauges and counters for this worker.
+    """
+    pool = get_engine().pool
+    status = {"pool_class": type(pool).__name__, "mode": DB_POOL_MODE}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=DB_MAX_OVERFLOW,
+            timeout=DB_POOL_TIMEOUT,
+        )
+
+    status.update(
+        connects=pool_stats.connects,
+        checkouts=pool_stats.checkouts,
+        checkins=pool_stats.checkins,
+        invalidations=pool_stats.invalidations,
+        timeouts=pool_stats.timeouts,
+        waits=pool_stats.waits,
+        wait_seconds_total=round(pool_stats.wait_seconds_total, 6),
+        wait_seconds_max=round(pool_stats.wait_seconds_max, 6),
+    )
+    return status
+
 
-def get_db():
-    db = SessionLocal()
+async def get_db():
+    get_engine()
+    db_gate.acquire()
     try:
-        yield db
+        async with SessionLocal() as db:
+            yield db
     finally:
-        db.close()
+        db_gate.release()
@@ -1,16 +1,76 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from .database import engine
+from sqlalchemy.engine import Engine
+
+from .config import DB_CREATE_ALL, METRICS_ENABLED, SQL_INSTRUMENTATION, VOTE_WRITE_BEHIND
+from .database import Base, dispose_engine, get_engine, replicas
 from .models import post, user
+from .utils.events import event_broker
+from .utils.feed import hot_feed
+from .utils.hashing import hasher
+from .utils.instrumentation import SQLInstrumentationMiddleware, instrument
+from .utils.metrics import MetricsMiddleware, snapshot_writer
+from .utils.purge import user_purger
+from .utils.replicas import ReadYourWritesMiddleware
+from .utils.vote_buffer import vote_buffer
 
+from app.routers.admin import router as AdminRouter
 from app.routers.auth import router as AuthRouters
+from app.routers.metrics import router as MetricsRouter
 from app.routers.post import router as PostRouter
 
 
-# create table
-post.Base.metadata.create_all(bind=engine)
-user.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    engine = get_engine()
+    if DB_CREATE_ALL:
+        # development only, real databases are migrated with alembic
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    if VOTE_WRITE_BEHIND:
+        vote_buffer.start()
+    await hot_feed.start()
+    replicas.start()
+    await event_broker.start()
+    user_purger.start()
+    if METRICS_ENABLED:
+        snapshot_writer.start()
+    yield
+    if METRICS_ENABLED:
+        await snapshot_writer.stop()
+    await user_purger.stop()
+    await event_broker.stop()
+    await hot_feed.stop()
+    await replicas.stop()
+    if VOTE_WRITE_BEHIND:
+        await vote_buffer.stop()
+    hasher.shutdown()
+    await dispose_engine()
+
+
+def create_app() -> FastAPI:
+    """
+    Builds the application. Nothing here touches the database; the engine is
+    created by the lifespan (or the first request) and the schema is left to alembic.
+    """
+    app = FastAPI(lifespan=lifespan)
+
+    if SQL_INSTRUMENTATION:
+        instrument(Engine)
+        app.add_middleware(SQLInstrumentationMiddleware)
+
+    if replicas.urls:
+        app.add_middleware(ReadYourWritesMiddleware)
+
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(MetricsRouter)
+
+    app.include_router(AuthRouters, prefix="/api/v1/auth")
+    app.include_router(PostRouter, prefix="/api/v1/posts")
+    app.include_router(AdminRouter, prefix="/api/v1/admin")
+    return app
 
-app = FastAPI()
 
-app.include_router(AuthRouters, prefix="/api/v1/auth")
-app.include_router(PostRouter, prefix="/api/v1/posts")
+app = create_app()
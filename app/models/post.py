@@ -1,9 +1,9 @@
 from sqlalchemy import (
     Column,
+    Index,
     Integer,
     String,
     Enum,
-    DateTime,
     Text,
     ForeignKey,
     func,
@@ -12,7 +12,7 @@ from sqlalchemy import (
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
-from app.database import Base
+from app.database import Base, Timestamp
 
 
 class UserRole(enum.Enum):
@@ -28,44 +28,71 @@ class UserRole(enum.Enum):
 class Post(Base):
     __tablename__ = "posts"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String(100), nullable=False)
     content = Column(Text, nullable=False)
-    author_id = Column(
-        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
-    )
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(Timestamp, default=func.now())
+    updated_at = Column(Timestamp, default=func.now(), onupdate=func.now())
+    vote_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     author = relationship("User", back_populates="posts")
-    comments = relationship("Comment", back_populates="post", cascade="all,delete")
-    votes = relationship("Vote", back_populates="post", cascade="all,delete")
+    # the foreign keys cascade in the database, so deleting a post loads none of these
+    comments = relationship(
+        "Comment", back_populates="post", cascade="all,delete", passive_deletes=True
+    )
+    votes = relationship("Vote", back_populates="post", cascade="all,delete", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_posts_author_id_updated_at_id", author_id, updated_at.desc(), id.desc()),
+        Index("ix_posts_updated_at_id", updated_at.desc(), id.desc()),
+        # the hot feed's FEED_WINDOW_HOURS range
+        Index("ix_posts_created_at", created_at),
+    )
 
 
 class Comment(Base):
     __tablename__ = "comments"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     content = Column(Text, nullable=False)
-    post_id = Column(
-        Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, index=True
-    )
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
     author_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
     )
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(Timestamp, default=func.now())
+    # Threads: root_id is the thread's top comment (itself for top comments) and path
+    # the zero padded ids from the root down to this comment, so a subtree is one
+    # root_id + path prefix range. reply_count counts every reply below the comment.
+    parent_id = Column(Integer, ForeignKey("comments.id", ondelete="CASCADE"), index=True)
+    root_id = Column(Integer)
+    path = Column(Text, nullable=False, default="", server_default="")
+    depth = Column(Integer, nullable=False, default=0, server_default="0")
+    reply_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     post = relationship("Post", back_populates="comments")
     author = relationship("User", back_populates="comments")
 
+    __table_args__ = (
+        Index("ix_comments_post_id_created_at_id", post_id, created_at.desc(), id.desc()),
+        Index(
+            "ix_comments_post_id_roots",
+            post_id,
+            created_at.desc(),
+            id.desc(),
+            postgresql_where=parent_id.is_(None),
+            sqlite_where=parent_id.is_(None),
+        ),
+        Index("ix_comments_root_id_path", root_id, path),
+    )
+
 
 class Vote(Base):
     __tablename__ = "votes"
 
-    id = Column(Integer, primary_key=True, index=True)
-    post_id = Column(
-        Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, index=True
-    )
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
     )
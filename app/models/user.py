@@ -1,9 +1,9 @@
 from sqlalchemy import (
     Column,
+    Index,
     Integer,
     String,
     Enum,
-    DateTime,
     Text,
     ForeignKey,
     func,
@@ -12,7 +12,7 @@ from sqlalchemy import (
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
-from app.database import Base
+from app.database import Base, Timestamp
 
 
 class UserRole(enum.Enum):
@@ -23,15 +23,31 @@ class UserRole(enum.Enum):
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     username = Column(String(50), unique=True, nullable=False)
     password = Column(String(128), nullable=False)
     role = Column(Enum(UserRole), default=UserRole.regular, nullable=False)
-    created_at = Column(DateTime, default=func.now(), nullable=False)
+    created_at = Column(Timestamp, default=func.now(), nullable=False)
+    # Set when the user is deleted but their rows are still being purged in the
+    # background (app.utils.purge); such users are hidden everywhere.
+    deleted_at = Column(Timestamp)
 
-    posts = relationship("Post", back_populates="author", cascade="all,delete")
-    comments = relationship("Comment", back_populates="author", cascade="all,delete")
-    votes = relationship("Vote", back_populates="user", cascade="all,delete")
+    # the foreign keys cascade in the database, so deleting a user loads none of these
+    posts = relationship("Post", back_populates="author", cascade="all,delete", passive_deletes=True)
+    comments = relationship(
+        "Comment", back_populates="author", cascade="all,delete", passive_deletes=True
+    )
+    votes = relationship("Vote", back_populates="user", cascade="all,delete", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_users_created_at_id", created_at.desc(), id.desc()),
+        Index(
+            "ix_users_deleted_at",
+            deleted_at,
+            postgresql_where=deleted_at.is_not(None),
+            sqlite_where=deleted_at.is_not(None),
+        ),
+    )
 
     def __repr__(self):
         return f"<User(username='{self.username}', role='{self.role}')>"
@@ -1,36 +1,33 @@
-from fastapi import HTTPException
-from app.utils.auth import decode_access_token, get_current_user
-from fastapi import Depends, HTTPException, Query, APIRouter, Request
+from fastapi import Depends, HTTPException
+from app.schemas.user import UserResponse, UserRole
+from app.utils.auth import get_current_user
+from app.utils.replicas import get_current_reader
 
 
-def is_admin(token: str):
+async def is_admin(user: UserResponse = Depends(get_current_user)):
     """
     Dependency to check if the user is an admin.
+
+    The role is read from the (cached) user row rather than the token claims,
+    so a role change takes effect as soon as that user's cache entry is dropped.
     """
-    try:
-        decoded = decode_access_token(token)
-        role = decoded.get("role")
-        print(role)
-        if role != "admin":
-            raise HTTPException(status_code=403, detail="Only Admin can access this endpoint")
+    if user.role != UserRole.admin:
+        raise HTTPException(status_code=403, detail="Only Admin can access this endpoint")
+
+    return
+
 
-        return
-    except Exception as e:
-        print(e)
-        raise HTTPException(status_code=403, detail=str(e))
+async def is_admin_reader(user: UserResponse = Depends(get_current_reader)):
+    """
+    is_admin for read-only routes, resolving the user on their read session.
+    """
+    return await is_admin(user)
 
 
-def is_regular_user(token: str):
+async def is_regular_user(user: UserResponse = Depends(get_current_user)):
     """
     Dependency to check if the user is an regular user.
     """
-    try:
-        decoded = decode_access_token(token)
-        role = decoded.get("role")
-        if role != "regular":
-            raise HTTPException(
-                status_code=403, detail="Only Regular User can access this endpoint"
-            )
-    except Exception as e:
-        raise HTTPException(status_code=403, detail="Invalid token or access forbidden")
+    if user.role != UserRole.regular:
+        raise HTTPException(status_code=403, detail="Only Regular User can access this endpoint")
     return True
@@ -0,0 +1,47 @@
+from enum import Enum
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from app.database import SessionLocal, pool_status
+from app.permission import is_admin
+from app.utils.export import MEDIA_TYPES, export_rows
+
+
+router = APIRouter()
+
+
+class ExportTable(str, Enum):
+    posts = "posts"
+    comments = "comments"
+    votes = "votes"
+    users = "users"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+@router.get("/pool/", response_model=dict)
+async def get_pool_status(has_permission=Depends(is_admin)):
+    return pool_status()
+
+
+@router.get("/export/{table}/")
+async def export_table(
+    table: ExportTable,
+    format: ExportFormat = Query(ExportFormat.ndjson),
+    gzip: bool = Query(False),
+    has_permission=Depends(is_admin),
+):
+    # one streamed query instead of paging (and counting) through the list endpoints
+    headers = {"Content-Disposition": f'attachment; filename="{table.value}.{format.value}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        export_rows(SessionLocal, table.value, format.value, gzip=gzip),
+        media_type=MEDIA_TYPES[format.value],
+        headers=headers,
+    )
@@ -1,90 +1,171 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse
 from app.schemas.user import Login, PaginatedUserResponse, UserCreate, UserResponse, UserRole
 from app.models.user import User
-from app.utils.auth import hash_password, verify_password, create_access_token
+from app.utils.auth import hasher, create_access_token, invalidate_user
+from app.utils.ratelimit import rate_limit
+from app.utils.replicas import get_read_db
+from app.config import PURGE_THRESHOLD
 from app.database import get_db
+from sqlalchemy import delete, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.future import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.utils.pagination import PaginationMeta, paginate
+from typing import Optional
+from app.utils.pagination import TotalMode, paginate, pagination_meta
+from app.utils.serialization import columns_for, json_response
+from app.utils.counters import refresh_post_caches
+from app.utils.purge import delete_user_rows, owned_rows, user_purger
 
 
 router = APIRouter()
 
 
-@router.post("/register/",response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == user.username).first():
+@router.post(
+    "/register/",
+    response_model=UserResponse,
+    dependencies=[Depends(rate_limit("register"))],
+)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    if (await db.execute(select(User).where(User.username == user.username))).scalars().first():
         raise HTTPException(status_code=400, detail="Username already exisit")
-    hashed_password = hash_password(user.password)
+    # end the read transaction so no pooled connection is held while hashing
+    await db.commit()
+
+    hashed_password = await hasher.hash(user.password)
     new_user = User(username=user.username, password=hashed_password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username already exisit")
+    await db.refresh(new_user)
     return new_user
 
 
-@router.post("/login/", response_model=dict)
-def login(user: Login, db: Session = Depends(get_db)):
+@router.post(
+    "/login/",
+    response_model=dict,
+    dependencies=[Depends(rate_limit("login"))],
+)
+async def login(user: Login, db: AsyncSession = Depends(get_db)):
 
-    db_user = db.query(User).filter(User.username == user.username).first()
-    if not db_user:
+    result = await db.execute(select(User).where(User.username == user.username))
+    db_user = result.scalars().first()
+    if not db_user or db_user.deleted_at is not None:
         raise HTTPException(status_code=404, detail="User not found")
+    # end the read transaction so no pooled connection is held while hashing
+    await db.commit()
 
-    if not verify_password(user.password, db_user.password):
+    verified, new_hash = await hasher.verify_and_update(user.password, db_user.password)
+    if not verified:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    user_response = UserResponse.from_orm(db_user)
-    access_token = create_access_token({"sub": db_user.username, "role": db_user.role.value})
-    return {"access_token": access_token, "token_type": "Bearer", **user_response.dict()}
+    if new_hash:
+        # the stored hash used outdated Argon2 parameters
+        db_user.password = new_hash
+        await db.commit()
+
+    user_response = UserResponse.model_validate(db_user)
+    access_token = create_access_token(
+        {"sub": db_user.username, "user_id": db_user.id, "role": db_user.role.value}
+    )
+    return {"access_token": access_token, "token_type": "Bearer", **user_response.model_dump()}
 
 
 @router.get("/users/", response_model=PaginatedUserResponse)
-def get_all_users(
-    db: Session = Depends(get_db),
+async def get_all_users(
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    total: Optional[TotalMode] = Query(None),
 ):
     # Query to fetch all users with optional filtering
-    query = db.query(User).order_by(User.created_at.desc())
-    paginated_users = paginate(query, page, page_size)
+    query = (
+        select(*columns_for(UserResponse, User))
+        .where(User.deleted_at.is_(None))
+        .order_by(User.created_at.desc(), User.id.desc())
+    )
+    paginated_users = await paginate(
+        db, query, page, page_size, keyset=(User.created_at, User.id), cursor=cursor, total=total
+    )
 
     # Return paginated response
-    return PaginatedUserResponse(
-        meta=PaginationMeta(
-            current_page=paginated_users["current_page_number"],
-            total_pages=paginated_users["total_page_number"],
-            total_results=paginated_users["total_result"],
-        ),
-        users=paginated_users["data"],
+    return json_response(
+        PaginatedUserResponse(
+            meta=pagination_meta(paginated_users),
+            users=paginated_users["data"],
+        )
     )
 
 
 @router.get("/users/{user_id}/", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+async def get_user(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    user = await db.get(User, user_id)
+    if not user or user.deleted_at is not None:
         raise HTTPException(404, "User not found")
 
     return user
 
 
 @router.patch("/users/{user_id}/", response_model=UserResponse)
-def update_user_role(user_id: int, role: UserRole, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+async def update_user_role(user_id: int, role: UserRole, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
+    if not user or user.deleted_at is not None:
         raise HTTPException(404, "User not found")
     user.role = role
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    invalidate_user(user_id)
     return user
 
 
 @router.delete("/users/{user_id}/", status_code=204)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
+    if not user or user.deleted_at is not None:
         raise HTTPException(404, "User not found")
-    db.delete(user)
-    db.commit()
+
+    owned = await owned_rows(db, user_id, limit=PURGE_THRESHOLD + 1)
+    if sum(owned.values()) > PURGE_THRESHOLD:
+        # too much to delete in one transaction: hide the user now, purge in chunks
+        user.deleted_at = func.now()
+        await db.commit()
+        invalidate_user(user_id)
+        user_purger.schedule(user_id)
+        return JSONResponse(
+            status_code=202,
+            content={
+                "detail": "user deletion started",
+                "progress": f"/api/v1/auth/users/{user_id}/purge/",
+            },
+        )
+
+    posts = await delete_user_rows(db, user_id)
+    await db.execute(delete(User).where(User.id == user_id))
+    await db.commit()
+    invalidate_user(user_id)
+    await refresh_post_caches(posts)
     return {"detail": "user deleted successfully"}
+
+
+@router.get("/users/{user_id}/purge/", response_model=dict)
+async def get_user_purge(user_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Progress of a background user deletion: what the user still owns. Once the
+    purge is done the user no longer exists and this returns 404.
+    """
+    deleted_at = (
+        await db.execute(select(User.deleted_at).where(User.id == user_id))
+    ).scalar_one_or_none()
+    if deleted_at is None:
+        raise HTTPException(404, "No deletion in progress for this user")
+
+    return {
+        "user_id": user_id,
+        "deleted_at": deleted_at.isoformat(),
+        "remaining": await owned_rows(db, user_id),
+    }
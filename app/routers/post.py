@@ -1,122 +1,387 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, requests
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, requests
+from fastapi.responses import StreamingResponse
 from app.schemas.post import (
     PaginatedCommentResponse,
     PaginatedPostResponse,
+    PaginatedSearchResponse,
     PaginationMeta,
     PostCreate,
     PostResponse,
+    CommentBulkCreate,
     CommentCreate,
     CommentRespond,
+    CommentThread,
+    PostBulkDelete,
+    ReplyCreate,
+    PostBulkUpdate,
     VoteAction,
-    VoteResponse,
+    VoteActionResponse,
     PostWithCommentsandVoteDetail,
 )
 from app.models.post import Post, Comment, Vote
 from app.utils.auth import decode_access_token, get_current_user
-from app.models.user import User
-from app.permission import is_admin
-from app.database import get_db
+from app.utils.ratelimit import rate_limit
+from app.utils.replicas import get_current_reader, get_read_db, reads_own_writes, reads_replica
+from app.schemas.user import UserResponse
+from app.permission import is_admin_reader
+from app.config import EVENTS_KEEPALIVE, VOTE_WRITE_BEHIND
+from app.database import SessionLocal, get_db, get_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import delete, insert
 from sqlalchemy.future import select
-from sqlalchemy.orm import Session
-
-from app.utils.pagination import paginate
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from typing import Optional
+from app.utils.bulk import (
+    BulkResult,
+    create_comments,
+    create_posts,
+    delete_posts,
+    run_bulk,
+    update_posts,
+)
+from app.utils.counters import adjust_post_counters
+from app.utils.events import event_broker, sse_message
+from app.utils.feed import hot_feed
+from app.utils.instrumentation import query_budget
+from app.utils.pagination import TotalMode, paginate, pagination_meta
+from app.utils.response_cache import etag_response, response_cache
+from app.utils.search import search
+from app.utils.serialization import columns_for, json_response
+from app.utils.threads import (
+    fetch_thread,
+    list_threads,
+    load_parents,
+    place_comments,
+    remove_subtrees,
+    reply_error,
+)
+from app.utils.vote_buffer import read_vote_state, vote_buffer
+from app.utils.votes import cast_vote, retract_vote
+from sqlalchemy.orm import joinedload
+import json
 
 router = APIRouter()
 
 
 @router.post("/create/", response_model=PostResponse)
-def create_post(
-    post: PostCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)
+async def create_post(
+    post: PostCreate,
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
 ):
-    post_obj = Post(title=post.title, content=post.content, author=user)
+    post_obj = Post(title=post.title, content=post.content, author_id=user.id)
 
     db.add(post_obj)
-    db.commit()
-    db.refresh(post_obj)
+    await db.commit()
+    await db.refresh(post_obj)
+    hot_feed.track(post_obj.id, post_obj.created_at, 0, 0)
     return post_obj
 
 
+# Bulk endpoints take a JSON array, or NDJSON (application/x-ndjson) for large loads,
+# and report a result per item: ids[i] is the affected id or null with an entry in errors.
+@router.post("/bulk/", response_model=BulkResult, dependencies=[Depends(rate_limit("bulk"))])
+async def bulk_create_posts(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
+):
+    return await run_bulk(db, request, PostCreate, create_posts, user.id)
+
+
+@router.put("/bulk/", response_model=BulkResult, dependencies=[Depends(rate_limit("bulk"))])
+async def bulk_update_posts(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
+):
+    return await run_bulk(db, request, PostBulkUpdate, update_posts, user.id)
+
+
+@router.post("/bulk/delete/", response_model=BulkResult, dependencies=[Depends(rate_limit("bulk"))])
+async def bulk_delete_posts(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
+):
+    return await run_bulk(db, request, PostBulkDelete, delete_posts, user.id)
+
+
+@router.post(
+    "/comments/bulk/",
+    response_model=BulkResult,
+    dependencies=[Depends(rate_limit("bulk"))],
+)
+async def bulk_create_comments(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
+):
+    return await run_bulk(db, request, CommentBulkCreate, create_comments, user.id)
+
+
 @router.get("/my-posts/", response_model=PaginatedPostResponse)
-def list_user_posts(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+async def list_user_posts(
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    total: Optional[TotalMode] = Query(None),
 ):
-    query = db.query(Post).filter(Post.author_id == user.id).order_by(Post.updated_at.desc())
-    paginated_posts = paginate(query, page, page_size)
+    query = (
+        select(*columns_for(PostResponse, Post))
+        .where(Post.author_id == user.id)
+        .order_by(Post.updated_at.desc(), Post.id.desc())
+    )
+    paginated_posts = await paginate(
+        db,
+        query,
+        page,
+        page_size,
+        keyset=(Post.updated_at, Post.id),
+        cursor=cursor,
+        total=total,
+    )
 
-    return PaginatedPostResponse(
-        meta=PaginationMeta(
-            current_page=paginated_posts["current_page_number"],
-            total_pages=paginated_posts["total_page_number"],
-            total_results=paginated_posts["total_result"],
-        ),
-        posts=paginated_posts["data"],
+    return json_response(
+        PaginatedPostResponse(
+            meta=pagination_meta(paginated_posts),
+            posts=paginated_posts["data"],
+        )
     )
 
 
-@router.get("/list-all/", response_model=PaginatedPostResponse)
-def list_post(
-    has_permission=Depends(is_admin),
-    db: Session = Depends(get_db),
+@router.get(
+    "/list-all/",
+    response_model=PaginatedPostResponse,
+    dependencies=[Depends(rate_limit("list_all"))],
+)
+async def list_post(
+    has_permission=Depends(is_admin_reader),
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    total: Optional[TotalMode] = Query(None),
 ):
     # Query all posts
-    query = db.query(Post).order_by(Post.updated_at.desc())
-    paginated_posts = paginate(query, page, page_size)
+    query = select(*columns_for(PostResponse, Post)).order_by(
+        Post.updated_at.desc(), Post.id.desc()
+    )
+    paginated_posts = await paginate(
+        db,
+        query,
+        page,
+        page_size,
+        keyset=(Post.updated_at, Post.id),
+        cursor=cursor,
+        total=total,
+    )
 
     # Return paginated data
-    return PaginatedPostResponse(
-        meta=PaginationMeta(
-            current_page=paginated_posts["current_page_number"],
-            total_pages=paginated_posts["total_page_number"],
-            total_results=paginated_posts["total_result"],
-        ),
-        posts=paginated_posts["data"],
+    return json_response(
+        PaginatedPostResponse(
+            meta=pagination_meta(paginated_posts),
+            posts=paginated_posts["data"],
+        )
+    )
+
+
+@router.get("/feed/", response_model=PaginatedPostResponse)
+async def hot_posts(
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+):
+    # The ranking is precomputed by the hot feed, only the page's rows are loaded
+    entries, next_cursor = hot_feed.page(page_size, cursor)
+    posts = {}
+    if entries:
+        result = await db.execute(
+            select(*columns_for(PostResponse, Post)).where(Post.id.in_([e.id for e in entries]))
+        )
+        posts = {post.id: post for post in result}
+    for entry in entries:
+        if entry.id not in posts:
+            hot_feed.discard(entry.id)
+
+    return json_response(
+        PaginatedPostResponse(
+            meta=PaginationMeta(total_results=len(hot_feed), next_cursor=next_cursor),
+            posts=[posts[e.id] for e in entries if e.id in posts],
+        )
     )
 
 
-@router.get("/{post_id}/detail/", response_model=PostWithCommentsandVoteDetail)
-def get_comprehensive_post(
-    post_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)
+@router.get(
+    "/search/",
+    response_model=PaginatedSearchResponse,
+    dependencies=[Depends(rate_limit("search"))],
+)
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    include_comments: bool = Query(False),
+    highlight: bool = Query(True),
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
 ):
-    post = (
-        db.query(Post)
-        .filter(Post.id == post_id)
-        .options(joinedload(Post.author), selectinload(Post.comments), selectinload(Post.votes))
-        .first()
+    # Ranked full-text search; snippets mark matches with <mark> and are not HTML-escaped
+    results = await search(
+        db,
+        q,
+        page_size,
+        cursor=cursor,
+        include_comments=include_comments,
+        highlight=highlight,
     )
-    print(post)
+
+    return json_response(
+        PaginatedSearchResponse(
+            meta=pagination_meta(results),
+            results=results["data"],
+        )
+    )
+
+
+@router.get(
+    "/{post_id}/detail/",
+    response_model=PostWithCommentsandVoteDetail,
+    dependencies=[Depends(query_budget(4))],
+)
+async def get_comprehensive_post(
+    post_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    user: UserResponse = Depends(get_current_reader),
+    comments_limit: int = Query(10, ge=0, le=100),
+    comments_cursor: Optional[str] = Query(None),
+    votes_limit: int = Query(0, ge=0, le=100),
+):
+    # served from the response cache unless buffered votes have to be overlaid
+    buffered = VOTE_WRITE_BEHIND and vote_buffer.has_pending(post_id)
+    cache_key = None
+    if not buffered:
+        cache_key = await response_cache.key(
+            post_id, f"detail:{comments_limit}:{comments_cursor}:{votes_limit}"
+        )
+        # a client reading its own writes refreshes the entry instead of trusting it
+        cached = None if reads_own_writes(request) else await response_cache.get(cache_key)
+        if cached:
+            return etag_response(request, *cached)
+
+    result = await db.execute(
+        select(Post).where(Post.id == post_id).options(joinedload(Post.author))
+    )
+    post = result.scalars().first()
 
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    vote_count = len(post.votes)
-
-    return {
+    # Only the newest comments are embedded, the rest are reached through the cursor;
+    # the vote list is off by default since vote_count already summarises it.
+    comments, comments_next_cursor = [], None
+    if comments_limit:
+        query = (
+            select(*columns_for(CommentRespond, Comment))
+            .where(Comment.post_id == post_id)
+            .order_by(Comment.created_at.desc(), Comment.id.desc())
+        )
+        paginated_comments = await paginate(
+            db,
+            query,
+            1,
+            comments_limit,
+            keyset=(Comment.created_at, Comment.id),
+            cursor=comments_cursor,
+            total=TotalMode.none,
+        )
+        comments = paginated_comments["data"]
+        comments_next_cursor = paginated_comments["next_cursor"]
+
+    votes = []
+    if votes_limit:
+        result = await db.execute(
+            select(Vote.post_id, Vote.user_id)
+            .where(Vote.post_id == post_id)
+            .order_by(Vote.id.desc())
+            .limit(votes_limit)
+        )
+        votes = result.all()
+
+    vote_count = post.vote_count
+    if buffered:
+        # read-your-writes: show votes that are still waiting in the buffer
+        vote_count += vote_buffer.pending_delta(post_id)
+        voted = vote_buffer.pending_vote(post_id, user.id)
+        if voted is not None and votes_limit:
+            votes = [v for v in votes if v.user_id != user.id]
+            if voted:
+                votes = [{"post_id": post_id, "user_id": user.id}] + votes[: votes_limit - 1]
+
+    detail = {
         "id": post.id,
         "title": post.title,
         "content": post.content,
         "author": post.author,
-        "comments": post.comments,
-        "votes": post.votes,
+        "comments": comments,
+        "comments_next_cursor": comments_next_cursor,
+        "votes": votes,
         "vote_count": vote_count,
+        "comment_count": post.comment_count,
         "created_at": post.created_at,
         "updated_at": post.updated_at,
     }
+    body = PostWithCommentsandVoteDetail.model_validate(detail, from_attributes=True)
+    body = body.model_dump_json().encode()
+    if reads_replica(request):
+        cache_key = None
+    return etag_response(request, await response_cache.set(cache_key, body), body)
+
+
+# Live comments and vote counts for a post, as Server-Sent Events; replaces polling the detail
+@router.get("/{post_id}/events/")
+async def post_events(post_id: int):
+    # subscribed before the snapshot is read, so no event falls in between
+    subscriber = event_broker.subscribe(post_id)
+    try:
+        # a session of its own: the stream must not keep a connection (or a gate slot)
+        get_engine()
+        async with SessionLocal() as db:
+            post = await db.get(Post, post_id)
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+    except BaseException:
+        event_broker.unsubscribe(subscriber)
+        raise
+
+    vote_count = post.vote_count
+    if VOTE_WRITE_BEHIND:
+        vote_count += vote_buffer.pending_delta(post_id)
+    snapshot = sse_message(
+        "snapshot",
+        json.dumps({"vote_count": vote_count, "comment_count": post.comment_count}, separators=(",", ":")),
+    )
+    return StreamingResponse(
+        event_broker.stream(subscriber, snapshot, EVENTS_KEEPALIVE),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.put("/{post_id}/", response_model=PostResponse)
-def update_post(
+async def update_post(
     post_id: int,
     updated_data: PostCreate,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
 ):
-    post = db.query(Post).filter(Post.id == post_id, Post.author_id == user.id).first()
+    result = await db.execute(select(Post).where(Post.id == post_id, Post.author_id == user.id))
+    post = result.scalars().first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found or unauthorized")
 
@@ -124,130 +389,264 @@ def update_post(
 
     post.content = updated_data.content
 
-    db.commit()
-    db.refresh(post)
+    await db.commit()
+    await db.refresh(post)
+    await response_cache.invalidate(post_id)
 
     return post
 
 
 @router.delete("/{post_id}/", response_model=dict)
-def delete_post(
-    post_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)
+async def delete_post(
+    post_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    db.delete(post)
-    db.commit()
+    # comments and votes go with the post through the ON DELETE CASCADE foreign keys
+    deleted = await db.scalar(
+        delete(Post)
+        .where(Post.id == post_id, Post.author_id == user.id)
+        .returning(Post.id)
+        .execution_options(synchronize_session=False)
+    )
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Post not found or unauthorized")
+    await db.commit()
+    await response_cache.invalidate(post_id)
+    hot_feed.discard(post_id)
     return {"detail": "post deleted successfully"}
 
 
-@router.post("/vote/", response_model=VoteResponse)
-def vote_action(
-    vote: VoteAction, db: Session = Depends(get_db), user: User = Depends(get_current_user)
+@router.post(
+    "/vote/",
+    response_model=VoteActionResponse,
+    dependencies=[Depends(rate_limit("vote"))],
+)
+async def vote_action(
+    vote: VoteAction,
+    db: AsyncSession = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
 ):
-    post = db.query(Post).filter(Post.id == vote.post_id).first()
-
-    if not post:
+    if VOTE_WRITE_BEHIND:
+        return await _buffer_vote_action(vote, db, user)
+
+    # One INSERT ... ON CONFLICT DO NOTHING / DELETE ... RETURNING per action; the
+    # votes.post_id foreign key stands in for a separate post lookup.
+    try:
+        if vote.action == "vote":
+            vote_count = await cast_vote(db, vote.post_id, user.id)
+        else:
+            vote_count = await retract_vote(db, vote.post_id, user.id)
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Post not found")
 
-    existing_vote = db.query(Vote).filter(Vote.post_id == post.id, Vote.user_id == user.id).first()
-
-    if vote.action == "vote":
-        if existing_vote:
+    if vote_count is None:
+        await db.rollback()
+        if vote.action == "vote":
             raise HTTPException(status_code=400, detail="You have already voted")
-        new_vote = Vote(post_id=post.id, user_id=user.id)
-        db.add(new_vote)
-        db.commit()
-        return {"post_id": post.id, "user_id": user.id, "message": "voted successfully"}
+        if not await db.get(Post, vote.post_id):
+            raise HTTPException(status_code=404, detail="Post not found")
+        raise HTTPException(status_code=400, detail="No vote to remove")
+
+    await db.commit()
+    await response_cache.invalidate(vote.post_id)
+    hot_feed.update(vote.post_id, vote_count=vote_count)
+    event_broker.publish(vote.post_id, "votes", {"vote_count": vote_count})
+    message = "voted successfully" if vote.action == "vote" else "unvoted successfully"
+    return {
+        "post_id": vote.post_id,
+        "user_id": user.id,
+        "vote_count": vote_count,
+        "message": message,
+    }
+
+
+async def _buffer_vote_action(vote: VoteAction, db: AsyncSession, user: UserResponse):
+    """
+    Write-behind variant of vote_action: validates against the stored and buffered
+    state with one read, then leaves the write to the vote buffer's next flush.
+    """
+    state = await read_vote_state(db, vote.post_id, user.id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Post not found")
 
-    elif vote.action == "unvote":
-        if not existing_vote:
-            raise HTTPException(status_code=400, detail="No vote to remove")
-        db.delete(existing_vote)
-        db.commit()
-        return {"post_id": post.id, "user_id": user.id, "message": "unvoted successfully"}
+    stored_count, stored = state
+    voted = vote_buffer.pending_vote(vote.post_id, user.id)
+    if voted is None:
+        voted = stored
+
+    if vote.action == "vote" and voted:
+        raise HTTPException(status_code=400, detail="You have already voted")
+    if vote.action == "unvote" and not voted:
+        raise HTTPException(status_code=400, detail="No vote to remove")
+
+    vote_buffer.add(vote.post_id, user.id, vote.action == "vote", stored)
+    vote_count = stored_count + vote_buffer.pending_delta(vote.post_id)
+    hot_feed.update(vote.post_id, vote_count=vote_count)
+    event_broker.publish(vote.post_id, "votes", {"vote_count": vote_count})
+    message = "voted successfully" if vote.action == "vote" else "unvoted successfully"
+    return {
+        "post_id": vote.post_id,
+        "user_id": user.id,
+        "vote_count": vote_count,
+        "message": message,
+    }
 
 
-# Add a comment to a post
+# Add a comment to a post, or a reply to one of its comments
 @router.post("/{post_id}/comments/", response_model=dict)
-def comment_on_post(
+async def comment_on_post(
     post_id: int,
-    comment: CommentCreate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    comment: ReplyCreate,
+    user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
 
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await db.get(Post, post_id)
 
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    new_comment = Comment(content=comment.content, post_id=post.id, author_id=user.id)
-    db.add(new_comment)
-    db.commit()
-    return {"detail": "Comment added successfully"}
+    parent = None
+    if comment.parent_id is not None:
+        parent = (await load_parents(db, [comment.parent_id])).get(comment.parent_id)
+        error = reply_error(parent, post_id)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+
+    result = await db.execute(
+        insert(Comment)
+        .values(
+            content=comment.content,
+            post_id=post.id,
+            author_id=user.id,
+            parent_id=comment.parent_id,
+        )
+        .returning(Comment.id, Comment.created_at)
+    )
+    comment_id, created_at = result.one()
+    await place_comments(db, [(comment_id, parent)])
+    comment_count = await db.scalar(
+        adjust_post_counters(post.id, comment_count=1).returning(Post.comment_count)
+    )
+    await db.commit()
+    await response_cache.invalidate(post.id)
+    hot_feed.track(post.id, post.created_at, post.vote_count, comment_count)
+    new_comment = CommentRespond(
+        id=comment_id,
+        content=comment.content,
+        author_id=user.id,
+        parent_id=comment.parent_id,
+        depth=parent.depth + 1 if parent else 0,
+        created_at=created_at,
+    )
+    event_broker.publish(
+        post.id,
+        "comment",
+        {"comment": new_comment.model_dump(mode="json"), "comment_count": comment_count},
+    )
+    return {"detail": "Comment added successfully", "id": comment_id}
 
 
-# List comments for a specific post
+# List a post's comments as threads: top comments paged, each with its first replies
 @router.get("/{post_id}/comments/", response_model=PaginatedCommentResponse)
-def list_comments(
+async def list_comments(
     post_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    total: Optional[TotalMode] = Query(None),
+    replies: int = Query(3, ge=0, le=100),
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
+    cache_key = await response_cache.key(
+        post_id, f"comments:{page}:{page_size}:{cursor}:{total and total.value}:{replies}"
+    )
+    cached = None if reads_own_writes(request) else await response_cache.get(cache_key)
+    if cached:
+        return etag_response(request, *cached)
+
+    post = await db.get(Post, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    query = db.query(Comment).filter(Comment.post_id == post_id).order_by(Comment.created_at.desc())
-    paginated_comments = paginate(query, page, page_size)
+    threads = await list_threads(db, post_id, page, page_size, cursor, total, replies)
 
-    return PaginatedCommentResponse(
-        meta=PaginationMeta(
-            current_page=paginated_comments["current_page_number"],
-            total_pages=paginated_comments["total_page_number"],
-            total_results=paginated_comments["total_result"],
-        ),
-        comments=paginated_comments["data"],
+    body = PaginatedCommentResponse(
+        meta=pagination_meta(threads),
+        comments=threads["data"],
     )
+    body = body.model_dump_json().encode()
+    if reads_replica(request):
+        cache_key = None
+    return etag_response(request, await response_cache.set(cache_key, body), body)
+
+
+# A comment with the whole thread below it
+@router.get("/comments/{comment_id}/thread/", response_model=CommentThread)
+async def get_comment_thread(
+    comment_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = Query(500, ge=1, le=1000),
+):
+    thread = await fetch_thread(db, comment_id, limit)
+    if thread is None:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    return json_response(CommentThread.model_validate(thread))
 
 
 # Update a comment
 @router.put("/comments/{comment_id}/", response_model=CommentRespond)
-def update_comment(
+async def update_comment(
     comment_id: int,
     updated_comment: CommentCreate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
 
-    comment = (
-        db.query(Comment).filter(Comment.id == comment_id, Comment.author_id == user.id).first()
+    result = await db.execute(
+        select(Comment).where(Comment.id == comment_id, Comment.author_id == user.id)
     )
+    comment = result.scalars().first()
 
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found or unauthorized")
 
     comment.content = updated_comment.content
-    db.commit()
-    return comment
+    await db.commit()
+    await response_cache.invalidate(comment.post_id)
+    updated = CommentRespond.model_validate(comment)
+    event_broker.publish(
+        comment.post_id, "comment_updated", {"comment": updated.model_dump(mode="json")}
+    )
+    return updated
 
 
 @router.delete("/comments/{comment_id}/", response_model=dict)
-def delete_comment(
+async def delete_comment(
     comment_id: int,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
 
-    # Fetch the comment and check ownership
-    comment = (
-        db.query(Comment).filter(Comment.id == comment_id, Comment.author_id == user.id).first()
+    # the comment goes with every reply below it, if it belongs to the user
+    counts = await remove_subtrees(
+        db,
+        select(Comment.root_id, Comment.path).where(
+            Comment.id == comment_id, Comment.author_id == user.id
+        ),
     )
-
-    if not comment:
+    if not counts:
         raise HTTPException(status_code=404, detail="Comment not found for the user")
 
-    db.delete(comment)
-    db.commit()
+    await db.commit()
+    for post_id, comment_count in counts:
+        await response_cache.invalidate(post_id)
+        hot_feed.update(post_id, comment_count=comment_count)
+        # the replies below it go too, clients drop the whole subtree
+        event_broker.publish(
+            post_id, "comment_deleted", {"id": comment_id, "comment_count": comment_count}
+        )
     return {"detail": "Comment deleted successfully"}
@@ -1,7 +1,7 @@
 from datetime import datetime
 from pydantic import BaseModel
 from enum import Enum
-from typing import List
+from typing import List, Optional
 
 from app.schemas.user import UserResponse
 from app.utils.pagination import PaginationMeta
@@ -17,6 +17,8 @@ class PostResponse(BaseModel):
     title: str
     content: str
     author_id: int
+    vote_count: int = 0
+    comment_count: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -29,22 +31,45 @@ class PaginatedPostResponse(BaseModel):
     meta: PaginationMeta
 
 
+class PostBulkUpdate(PostCreate):
+    id: int
+
+
+class PostBulkDelete(BaseModel):
+    id: int
+
+
 class CommentCreate(BaseModel):
     content: str
 
 
+class ReplyCreate(CommentCreate):
+    parent_id: Optional[int] = None
+
+
+class CommentBulkCreate(ReplyCreate):
+    post_id: int
+
+
 class CommentRespond(BaseModel):
     id: int
     content: str
     author_id: int
+    parent_id: Optional[int] = None
+    depth: int = 0
+    reply_count: int = 0
     created_at: datetime
 
     class Config:
         from_attributes = True
 
 
+class CommentThread(CommentRespond):
+    replies: List["CommentThread"] = []
+
+
 class PaginatedCommentResponse(BaseModel):
-    comments: List[CommentRespond]
+    comments: List[CommentThread]
     meta: PaginationMeta
 
 
@@ -63,6 +88,11 @@ class VoteResponse(BaseModel):
     user_id: int
 
 
+class VoteActionResponse(VoteResponse):
+    vote_count: int
+    message: str
+
+
 class PostWithCommentsandVoteDetail(BaseModel):
 
     id: int
@@ -70,10 +100,29 @@ class PostWithCommentsandVoteDetail(BaseModel):
     content: str
     author: UserResponse
     comments: list[CommentRespond]
+    comments_next_cursor: Optional[str] = None
     votes: list[VoteResponse]
     vote_count: int
+    comment_count: int
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class SearchHit(BaseModel):
+    kind: str
+    id: int
+    post_id: int
+    title: str
+    snippet: str
+    rank: float
+
+    class Config:
+        from_attributes = True
+
+
+class PaginatedSearchResponse(BaseModel):
+    results: List[SearchHit]
+    meta: PaginationMeta
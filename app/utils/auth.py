@@ -1,37 +1,27 @@
 from fastapi import Depends, HTTPException
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-import os
-from dotenv import load_dotenv
-
+import time
+
+from app.config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ALGORITHM,
+    AUTH_CACHE_SIZE,
+    AUTH_CACHE_TTL,
+    AUTH_USER_CACHE_TTL,
+    SECRET_KEY,
+)
 from app.database import get_db
 from app.models.user import User
-from sqlalchemy.orm import Session
-
-load_dotenv()
-
-# Retrieve the values from the environment
-SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 300))
+from app.schemas.user import UserResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.cache import TTLCache
+from app.utils.hashing import get_pwd_context, hash_password, hasher, verify_password
 
-# Use Argon2 for hashing
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
-
-def hash_password(password: str) -> str:
-    """
-    Hashes a password using Argon2.
-    """
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """
-    Verifies a password against a hashed password using Argon2.
-    """
-    return pwd_context.verify(plain_password, hashed_password)
+# Verified claims keyed by token signature, and resolved users keyed by id
+_token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+_user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
 
 
 def create_access_token(data: dict) -> str:
@@ -48,21 +38,56 @@ def create_access_token(data: dict) -> str:
 def decode_access_token(token: str):
     """
     Decodes a JWT access token and returns the payload.
+
+    Verified payloads are cached by signature until the token expires (or the
+    cache TTL passes), so repeated calls with the same token skip the HMAC check.
     """
+    signature = token.rpartition(".")[2]
+    payload = _token_cache.get(signature)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    ttl = AUTH_CACHE_TTL
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(signature, payload, ttl=ttl)
+    return payload
+
 
-def get_current_user(token: str, db: Session = Depends(get_db)):
+def invalidate_user(user_id: int):
+    """
+    Drops a cached user so the next request re-reads it from the database. Only
+    this worker's cache; the others catch up within AUTH_USER_CACHE_TTL.
+    """
+    _user_cache.delete(user_id)
+
+
+async def get_current_user(token: str, db: AsyncSession = Depends(get_db)) -> UserResponse:
     payload = decode_access_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Authentication Required or Invalid Token")
 
-    user = db.query(User).filter(User.username == payload["sub"]).first()
+    user_id = payload.get("user_id")
+    user = _user_cache.get(user_id) if user_id is not None else None
+    if user is not None:
+        return user
 
-    if not user:
+    if user_id is not None:
+        db_user = await db.get(User, user_id)
+    else:
+        # tokens issued before user_id was added to the claims
+        result = await db.execute(select(User).where(User.username == payload["sub"]))
+        db_user = result.scalars().first()
+
+    if not db_user or db_user.deleted_at is not None:
         raise HTTPException(status_code=404, detail="User not found")
+
+    user = UserResponse.model_validate(db_user)
+    _user_cache.set(user.id, user)
     return user
@@ -0,0 +1,253 @@
+import json
+from contextlib import aclosing
+from typing import List, Optional
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import BULK_CHUNK_SIZE, BULK_MAX_ITEMS
+from app.models.post import Comment, Post
+from app.utils.counters import adjust_post_counters, refresh_post_caches
+from app.utils.threads import load_parents, place_comments, reply_error
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+
+
+class BulkError(BaseModel):
+    index: int
+    detail: str
+
+
+class BulkResult(BaseModel):
+    succeeded: int = 0
+    failed: int = 0
+    ids: List[Optional[int]] = []
+    errors: List[BulkError] = []
+
+
+async def iter_items(request: Request):
+    """
+    Yields the raw items of a JSON array body, or of an NDJSON body line by line
+    as it arrives. Lines that are not valid JSON are yielded as ValueError.
+
+    An array longer than BULK_MAX_ITEMS is refused before any item is processed;
+    NDJSON is checked by run_bulk as it streams in.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in NDJSON_TYPES:
+        try:
+            items = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array")
+        if len(items) > BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request"
+            )
+        for item in items:
+            yield item
+        return
+
+    def parse(line: bytes):
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            return e
+
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield parse(line)
+    if buffer.strip():
+        yield parse(buffer)
+
+
+async def run_bulk(db: AsyncSession, request: Request, schema, handler, *args) -> BulkResult:
+    """
+    Validates every item against ``schema`` and hands them to ``handler`` in chunks of
+    BULK_CHUNK_SIZE, each committed on its own, so a bad item or a failed chunk
+    never undoes the rest of the load.
+
+    ``handler(db, chunk, *args)`` receives [(index, item)] and returns {index: id or
+    error message} with the posts it changed, in the form refresh_post_caches()
+    takes; the caches only follow once the chunk is committed.
+    """
+    result = BulkResult()
+
+    async def flush(chunk):
+        try:
+            outcome, posts = await handler(db, chunk, *args)
+            await db.commit()
+        except DBAPIError as e:
+            await db.rollback()
+            outcome = {index: f"Database error: {e.orig.__class__.__name__}" for index, _ in chunk}
+            posts = {}
+        await refresh_post_caches(posts)
+        for index, _ in chunk:
+            value = outcome.get(index, "Not processed")
+            if isinstance(value, str):
+                result.errors.append(BulkError(index=index, detail=value))
+            else:
+                result.ids[index] = value
+
+    chunk = []
+    async with aclosing(iter_items(request)) as items:
+        async for raw in items:
+            index = len(result.ids)
+            result.ids.append(None)
+            if index >= BULK_MAX_ITEMS:
+                # earlier chunks are committed, report them instead of failing the request
+                result.errors.append(
+                    BulkError(
+                        index=index,
+                        detail=f"At most {BULK_MAX_ITEMS} items per request, "
+                        "this and any later items were not read",
+                    )
+                )
+                break
+            try:
+                if isinstance(raw, ValueError):
+                    raise raw
+                chunk.append((index, schema.model_validate(raw)))
+            except ValidationError as e:
+                error = e.errors()[0]
+                location = ".".join(str(part) for part in error["loc"])
+                result.errors.append(BulkError(index=index, detail=f"{location}: {error['msg']}"))
+            except ValueError:
+                result.errors.append(BulkError(index=index, detail="Invalid JSON"))
+
+            if len(chunk) >= BULK_CHUNK_SIZE:
+                await flush(chunk)
+                chunk = []
+    if chunk:
+        await flush(chunk)
+
+    result.errors.sort(key=lambda error: error.index)
+    result.failed = len(result.errors)
+    result.succeeded = len(result.ids) - result.failed
+    return result
+
+
+async def _owned_posts(db: AsyncSession, post_ids, author_id: int):
+    result = await db.scalars(
+        select(Post.id).where(Post.id.in_(set(post_ids)), Post.author_id == author_id)
+    )
+    return set(result)
+
+
+async def create_posts(db: AsyncSession, chunk, author_id: int):
+    rows = [
+        {"title": item.title, "content": item.content, "author_id": author_id}
+        for _, item in chunk
+    ]
+    # rows come back in parameter order: one multi-row INSERT ... RETURNING per chunk on
+    # PostgreSQL, while SQLite has to insert them one statement at a time
+    result = await db.execute(
+        insert(Post).returning(Post.id, Post.created_at, sort_by_parameter_order=True), rows
+    )
+    created = result.all()
+    return (
+        {index: row.id for (index, _), row in zip(chunk, created)},
+        {post_id: {"created_at": created_at} for post_id, created_at in created},
+    )
+
+
+async def update_posts(db: AsyncSession, chunk, author_id: int):
+    owned = await _owned_posts(db, [item.id for _, item in chunk], author_id)
+    rows = {
+        item.id: {"id": item.id, "title": item.title, "content": item.content}
+        for _, item in chunk
+        if item.id in owned
+    }
+    if rows:
+        # executemany UPDATE by primary key, the last item wins for repeated ids
+        await db.execute(update(Post), list(rows.values()))
+    return (
+        {
+            index: item.id if item.id in owned else "Post not found or unauthorized"
+            for index, item in chunk
+        },
+        {post_id: {} for post_id in rows},
+    )
+
+
+async def delete_posts(db: AsyncSession, chunk, author_id: int):
+    owned = await _owned_posts(db, [item.id for _, item in chunk], author_id)
+    if owned:
+        # comments and votes go with the posts through the ON DELETE CASCADE foreign keys
+        await db.execute(
+            delete(Post)
+            .where(Post.id.in_(owned))
+            .execution_options(synchronize_session=False)
+        )
+    return (
+        {
+            index: item.id if item.id in owned else "Post not found or unauthorized"
+            for index, item in chunk
+        },
+        dict.fromkeys(owned),
+    )
+
+
+async def create_comments(db: AsyncSession, chunk, author_id: int):
+    post_ids = {item.post_id for _, item in chunk}
+    existing = set(await db.scalars(select(Post.id).where(Post.id.in_(post_ids))))
+    # a reply's parent has to exist before the chunk, not be created in it
+    parents = await load_parents(db, {item.parent_id for _, item in chunk if item.parent_id})
+
+    valid, outcome = [], {}
+    for index, item in chunk:
+        error = "Post not found" if item.post_id not in existing else None
+        if error is None and item.parent_id is not None:
+            error = reply_error(parents.get(item.parent_id), item.post_id)
+        if error:
+            outcome[index] = error
+        else:
+            valid.append((index, item))
+    if not valid:
+        return outcome, {}
+
+    rows = [
+        {
+            "content": item.content,
+            "post_id": item.post_id,
+            "author_id": author_id,
+            "parent_id": item.parent_id,
+        }
+        for _, item in valid
+    ]
+    result = await db.scalars(
+        insert(Comment).returning(Comment.id, sort_by_parameter_order=True), rows
+    )
+    comment_ids = result.all()
+    outcome.update({index: comment_id for (index, _), comment_id in zip(valid, comment_ids)})
+    await place_comments(
+        db,
+        [
+            (comment_id, parents.get(item.parent_id))
+            for (_, item), comment_id in zip(valid, comment_ids)
+        ],
+    )
+
+    # one counter UPDATE for the whole chunk, from the comments just inserted
+    added = (
+        select(Comment.post_id, func.count().label("n"))
+        .where(Comment.id.in_(comment_ids))
+        .group_by(Comment.post_id)
+        .subquery()
+    )
+    counts = await db.execute(
+        adjust_post_counters(added.c.post_id, comment_count=added.c.n).returning(
+            Post.id, Post.comment_count
+        )
+    )
+    return outcome, {
+        post_id: {"comment_count": comment_count} for post_id, comment_count in counts.all()
+    }
@@ -0,0 +1,45 @@
+from sqlalchemy import update
+
+from app.models.post import Post
+from app.utils.feed import hot_feed
+from app.utils.response_cache import response_cache
+
+
+def adjust_post_counters(post_id, **deltas):
+    """
+    Builds an atomic ``SET counter = counter + delta`` UPDATE for a post.
+
+    ``post_id`` and the deltas may be plain values or column expressions, which
+    lets one statement adjust many posts from a grouped subquery. updated_at is
+    pinned so that votes and comments don't reorder posts in updated_at listings.
+    """
+    values = {getattr(Post, name): getattr(Post, name) + delta for name, delta in deltas.items()}
+    values[Post.updated_at] = Post.updated_at
+    return (
+        update(Post)
+        .where(Post.id == post_id)
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def refresh_post_caches(posts: dict):
+    """
+    Brings the response cache and hot feed in line with committed changes to
+    ``posts``: {post_id: None for a deleted post, the new counters, or for a new
+    post its created_at with the counters}. Call it only once the commit returned,
+    or a concurrent read can cache rows that are rolled back.
+    """
+    for post_id, counters in posts.items():
+        await response_cache.invalidate(post_id)
+        if counters is None:
+            hot_feed.discard(post_id)
+        elif "created_at" in counters:
+            hot_feed.track(
+                post_id,
+                counters["created_at"],
+                counters.get("vote_count", 0),
+                counters.get("comment_count", 0),
+            )
+        elif counters:
+            hot_feed.update(post_id, **counters)
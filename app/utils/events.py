@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.engine import make_url
+
+from app.config import (
+    EVENTS_BRIDGE,
+    EVENTS_CHANNEL,
+    EVENTS_DATABASE_URL,
+    EVENTS_MAX_SUBSCRIBERS,
+    EVENTS_QUEUE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payloads must stay under 8000 bytes
+NOTIFY_MAX_BYTES = 7900
+
+
+def sse_message(event: str, payload: str) -> str:
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+# Sent instead of events a subscriber fell too far behind on; the client refetches the post
+RESYNC = sse_message("resync", "{}")
+
+
+class Subscriber:
+    """
+    One client's view of a post's events.
+
+    Messages are queued preformatted, up to ``max_queue``; vote counts only keep
+    the latest value. A subscriber that overflows loses its backlog and gets a
+    single resync instead, so a slow client costs bounded memory and never
+    holds up the publisher.
+    """
+
+    def __init__(self, post_id: int, max_queue: int):
+        self.post_id = post_id
+        self.max_queue = max_queue
+        self.closed = False
+        self._messages = deque()
+        self._votes = None
+        self._lagged = False
+        self._ready = asyncio.Event()
+
+    def push(self, message: str) -> bool:
+        """
+        Queues a message; returns False when it is the one that overflowed the queue.
+        """
+        if self._lagged:
+            return True
+        if len(self._messages) >= self.max_queue:
+            self._messages.clear()
+            self._lagged = True
+        else:
+            self._messages.append(message)
+        self._ready.set()
+        return not self._lagged
+
+    def push_votes(self, message: str):
+        self._votes = message
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def drain(self, timeout: float) -> list:
+        """
+        Waits up to ``timeout`` seconds for messages and returns all that are pending.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+
+        if self._lagged:
+            self._lagged, self._votes = False, None
+            return [RESYNC]
+        messages = list(self._messages)
+        self._messages.clear()
+        if self._votes is not None:
+            messages.append(self._votes)
+            self._votes = None
+        return messages
+
+
+class EventBroker:
+    """
+    In-process pub/sub of post events, optionally bridged to the other workers.
+
+    publish() never waits: local subscribers get the message right away and the
+    bridge sends it from its own task.
+    """
+
+    def __init__(self, max_queue: int, max_subscribers: int, bridge=None):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self.bridge = bridge
+        if bridge is not None:
+            bridge.broker = self
+        self.published = 0
+        self.resyncs = 0
+        self._subscribers = {}
+        self._count = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    def subscribe(self, post_id: int) -> Subscriber:
+        """
+        Registers a subscriber for the post, or answers 503 once this worker
+        holds ``max_subscribers``.
+        """
+        if self._count >= self.max_subscribers:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many live connections, retry shortly",
+                headers={"Retry-After": "5"},
+            )
+        subscriber = Subscriber(post_id, self.max_queue)
+        self._subscribers.setdefault(post_id, set()).add(subscriber)
+        self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.post_id)
+        if subscribers and subscriber in subscribers:
+            subscribers.remove(subscriber)
+            self._count -= 1
+            if not subscribers:
+                del self._subscribers[subscriber.post_id]
+
+    def publish(self, post_id: int, event: str, data: dict):
+        """
+        Sends an event to the post's subscribers here and, through the bridge, elsewhere.
+        """
+        if post_id not in self._subscribers and self.bridge is None:
+            return
+        self.published += 1
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        self.deliver(post_id, event, payload)
+        if self.bridge is not None:
+            self.bridge.send(post_id, event, payload)
+
+    def deliver(self, post_id: int, event: str, payload: str):
+        subscribers = self._subscribers.get(post_id)
+        if not subscribers:
+            return
+        message = sse_message(event, payload)
+        for subscriber in subscribers:
+            if event == "votes":
+                subscriber.push_votes(message)
+            elif not subscriber.push(message):
+                self.resyncs += 1
+
+    async def stream(self, subscriber: Subscriber, first: str, keepalive: float):
+        """
+        Yields the SSE body for one client: ``first``, then the post's events as
+        they come, with a comment line every ``keepalive`` seconds of silence.
+        Unsubscribes when the client goes away.
+        """
+        try:
+            yield "retry: 3000\n\n" + first
+            while not subscriber.closed:
+                messages = await subscriber.drain(keepalive)
+                yield "".join(messages) if messages else ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def start(self):
+        if self.bridge is not None:
+            await self.bridge.start()
+
+    async def stop(self):
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                subscriber.close()
+        if self.bridge is not None:
+            await self.bridge.stop()
+
+
+class PostgresEventBridge:
+    """
+    Relays events between workers over PostgreSQL LISTEN/NOTIFY.
+
+    Uses one dedicated asyncpg connection per worker. Outgoing vote counts are
+    coalesced per post while a send is in progress, and a worker ignores the
+    notifications it sent itself. The connection is re-opened after a failure;
+    events published meanwhile only reach local subscribers.
+    """
+
+    def __init__(self, url: str, channel: str):
+        self.url = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.broker = None
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.sent = 0
+        self.received = 0
+        self._outbox = deque()
+        self._votes = {}
+        self._wakeup = asyncio.Event()
+        self._connection = None
+        self._task = None
+
+    def send(self, post_id: int, event: str, payload: str):
+        if self._task is None:
+            return
+        if event == "votes":
+            if post_id not in self._votes:
+                self._outbox.append((post_id, event, None))
+            self._votes[post_id] = payload
+        else:
+            self._outbox.append((post_id, event, payload))
+        self._wakeup.set()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        message = json.loads(payload)
+        if message["o"] == self.origin:
+            return
+        self.received += 1
+        self.broker.deliver(message["p"], message["e"], message["d"])
+
+    async def _connect(self):
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self.url)
+        await self._connection.add_listener(self.channel, self._on_notify)
+        # wake the send loop so a lost connection is re-opened without waiting for an event
+        self._connection.add_termination_listener(lambda connection: self._wakeup.set())
+
+    async def _flush(self):
+        while self._outbox:
+            post_id, event, payload = self._outbox.popleft()
+            if event == "votes":
+                payload = self._votes.pop(post_id)
+            notification = json.dumps({"o": self.origin, "p": post_id, "e": event, "d": payload})
+            if len(notification.encode()) > NOTIFY_MAX_BYTES:
+                notification = json.dumps({"o": self.origin, "p": post_id, "e": "resync", "d": "{}"})
+            await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, notification)
+            self.sent += 1
+
+    async def _run(self):
+        while True:
+            try:
+                if self._connection is None or self._connection.is_closed():
+                    await self._connect()
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                await self._flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("event bridge failed, reconnecting", exc_info=True)
+                self._outbox.clear()
+                self._votes.clear()
+                self._connection = None
+                await asyncio.sleep(1)
+
+    async def start(self):
+        await self._connect()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
+
+
+def _create_bridge() -> Optional[PostgresEventBridge]:
+    if not EVENTS_BRIDGE:
+        return None
+    return PostgresEventBridge(EVENTS_DATABASE_URL, EVENTS_CHANNEL)
+
+
+event_broker = EventBroker(EVENTS_QUEUE_SIZE, EVENTS_MAX_SUBSCRIBERS, _create_bridge())
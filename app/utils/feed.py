@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import math
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Optional
+
+from sqlalchemy import Float, Integer, func, literal_column, select
+
+from app.config import (
+    FEED_COMMENT_WEIGHT,
+    FEED_DECAY_SECONDS,
+    FEED_REFRESH_INTERVAL,
+    FEED_SIZE,
+    FEED_WINDOW_HOURS,
+)
+from app.database import SessionLocal
+from app.models.post import Post
+from app.utils.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+FEED_KEYSET = (literal_column("score", Float), literal_column("id", Integer))
+
+
+def hot_score(vote_count: int, comment_count: int, created_at: datetime) -> float:
+    """
+    Time-decayed popularity: a post needs ten times the engagement to rank level
+    with one created FEED_DECAY_SECONDS later. The decay is part of the score
+    itself, so scores never have to be recomputed just because time passed.
+    Naive timestamps are read as UTC, as the database does in hot_score_sql().
+    """
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    engagement = vote_count + FEED_COMMENT_WEIGHT * comment_count
+    return math.log10(max(engagement, 1)) + created_at.timestamp() / FEED_DECAY_SECONDS
+
+
+def hot_score_sql(dialect: str):
+    """
+    hot_score() as a SQL expression, so the database ranks and limits the feed.
+    """
+    engagement = Post.vote_count + FEED_COMMENT_WEIGHT * Post.comment_count
+    if dialect == "postgresql":
+        magnitude = func.log(func.greatest(engagement, 1))
+        seconds = func.extract("epoch", Post.created_at)
+    else:
+        # SQLite's math functions (3.35+) and unixepoch (3.38+)
+        magnitude = func.log10(func.max(engagement, 1))
+        seconds = func.unixepoch(Post.created_at)
+    return magnitude + seconds / FEED_DECAY_SECONDS
+
+
+class HotFeed:
+    """
+    In-memory ranking of the hottest posts, kept per worker.
+
+    The top ``size`` posts are reloaded from the database every ``refresh_interval``
+    seconds and adjusted in between as posts are created, voted on and commented
+    on in this worker. ``_ranking`` is kept sorted as (-score, -id) pairs, so a
+    page is a slice and an update is a bisect.
+    """
+
+    def __init__(self, session_factory, size: int, refresh_interval: float):
+        self.session_factory = session_factory
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.refreshed_at: Optional[datetime] = None
+        self._posts = {}
+        self._ranking = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._ranking)
+
+    def _remove(self, post_id: int):
+        entry = self._posts.pop(post_id, None)
+        if entry is not None:
+            key = (-entry[0], -post_id)
+            del self._ranking[bisect_left(self._ranking, key)]
+        return entry
+
+    def track(self, post_id: int, created_at: datetime, vote_count: int, comment_count: int):
+        """
+        Ranks a post from a full snapshot of its counters; a post that does not make
+        the top ``size`` is left out.
+        """
+        self._remove(post_id)
+        score = hot_score(vote_count, comment_count, created_at)
+        key = (-score, -post_id)
+        if len(self._ranking) >= self.size and key > self._ranking[-1]:
+            return
+
+        self._posts[post_id] = (score, created_at, vote_count, comment_count)
+        insort(self._ranking, key)
+        while len(self._ranking) > self.size:
+            self._posts.pop(-self._ranking.pop()[1], None)
+
+    def update(
+        self, post_id: int, vote_count: Optional[int] = None, comment_count: Optional[int] = None
+    ):
+        """
+        Re-ranks a post that is already in the feed after one of its counters changed.
+        """
+        entry = self._posts.get(post_id)
+        if entry is None:
+            return
+        _, created_at, votes, comments = entry
+        self.track(
+            post_id,
+            created_at,
+            votes if vote_count is None else vote_count,
+            comments if comment_count is None else comment_count,
+        )
+
+    def discard(self, post_id: int):
+        self._remove(post_id)
+
+    def page(self, page_size: int, cursor: Optional[str] = None):
+        """
+        Returns the (id, score) entries after ``cursor`` and the cursor for the next page.
+        """
+        start = 0
+        if cursor is not None:
+            _, (score, post_id) = decode_cursor(cursor, FEED_KEYSET)
+            start = bisect_right(self._ranking, (-score, -post_id))
+
+        entries = [
+            SimpleNamespace(id=-negative_id, score=-negative_score)
+            for negative_score, negative_id in self._ranking[start:start + page_size]
+        ]
+        next_cursor = None
+        if entries and start + page_size < len(self._ranking):
+            next_cursor = encode_cursor(entries[-1], FEED_KEYSET, "next")
+        return entries, next_cursor
+
+    async def refresh(self):
+        """
+        Rebuilds the ranking from the top ``size`` posts created within
+        FEED_WINDOW_HOURS, ranked and limited by the database.
+        """
+        async with self.session_factory() as db:
+            # the window is measured on the database's clock, which stamped created_at
+            now = await db.scalar(select(func.now()))
+            score = hot_score_sql(db.get_bind().dialect.name)
+            result = await db.execute(
+                select(Post.id, Post.created_at, Post.vote_count, Post.comment_count)
+                .where(Post.created_at >= now - timedelta(hours=FEED_WINDOW_HOURS))
+                .order_by(score.desc(), Post.id.desc())
+                .limit(self.size)
+            )
+            top = [
+                (hot_score(votes, comments, created_at), post_id, created_at, votes, comments)
+                for post_id, created_at, votes, comments in result
+            ]
+
+        self._posts = {
+            post_id: (score, created_at, votes, comments)
+            for score, post_id, created_at, votes, comments in top
+        }
+        self._ranking = sorted((-score, -post_id) for score, post_id, *_ in top)
+        self.refreshed_at = now
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Refreshing the hot feed failed")
+
+    async def start(self):
+        if self._task is None:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Loading the hot feed failed")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+hot_feed = HotFeed(SessionLocal, FEED_SIZE, FEED_REFRESH_INTERVAL)
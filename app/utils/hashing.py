@@ -0,0 +1,130 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from fastapi import HTTPException
+
+from app.config import (
+    ARGON2_MEMORY_COST,
+    ARGON2_PARALLELISM,
+    ARGON2_TIME_COST,
+    HASH_MAX_QUEUE,
+    HASH_RETRY_AFTER,
+    HASH_WORKERS,
+)
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    Builds the Argon2 CryptContext on first use, in whichever process hashes.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__time_cost=ARGON2_TIME_COST,
+        argon2__memory_cost=ARGON2_MEMORY_COST,
+        argon2__parallelism=ARGON2_PARALLELISM,
+    )
+
+
+def hash_password(password: str) -> str:
+    """
+    Hashes a password using Argon2.
+    """
+    return get_pwd_context().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifies a password against a hashed password using Argon2.
+    """
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str):
+    """
+    Verifies a password and, when the context's needs_update flags the stored hash,
+    returns a fresh hash made with the current Argon2 parameters.
+    """
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+class HashingService:
+    """
+    Runs Argon2 in a bounded pool of worker processes, off the event loop.
+
+    At most ``workers + max_queue`` calls may be pending; beyond that callers get
+    a 503 with Retry-After instead of queueing behind a login burst.
+    """
+
+    def __init__(self, workers: int, max_queue: int, retry_after: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.seconds_total = 0.0
+        self._executor = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.in_flight - max(self.workers, 1), 0)
+
+    def _get_executor(self):
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.in_flight >= max(self.workers, 1) + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many concurrent password operations, retry shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            self.failed += 1
+            self._executor = None
+            raise HTTPException(
+                status_code=503,
+                detail="Password hashing is unavailable, retry shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.seconds_total += time.perf_counter() - start
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        return await self.run(verify_and_update, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hasher = HashingService(HASH_WORKERS, HASH_MAX_QUEUE, HASH_RETRY_AFTER)
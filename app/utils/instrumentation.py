@@ -0,0 +1,180 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.config import (
+    SQL_QUERY_BUDGET,
+    SQL_REPEAT_THRESHOLD,
+    SQL_SLOW_MS,
+    SQL_STRICT,
+)
+
+logger = logging.getLogger("app.sql")
+
+_PLACEHOLDERS = re.compile(r"(\$\d+|\?|%\(\w+\)s|%s|\b\d+\b|'(?:[^']|'')*')")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:::\w+)?(?:\s*,\s*\?(?:::\w+)?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when a request runs more statements than its budget."""
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Reduces a statement to its shape: parameters and literals become ``?`` and
+    expanded IN lists collapse, so the same query with other values matches.
+    """
+    statement = _PLACEHOLDERS.sub("?", _WHITESPACE.sub(" ", statement.strip()))
+    return _PLACEHOLDER_LISTS.sub("(?)", statement)
+
+
+class RequestStats:
+    """SQL activity of one request."""
+
+    def __init__(self, budget: int = SQL_QUERY_BUDGET):
+        self.started = time.perf_counter()
+        self.budget = budget
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slowest = (0.0, None)
+        self.fingerprints = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.statements += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest[0]:
+            self.slowest = (seconds, statement)
+        self.fingerprints[fingerprint(statement)] += 1
+
+        if SQL_STRICT and self.budget and self.statements > self.budget:
+            raise QueryBudgetExceeded(
+                f"{self.statements} statements exceed the budget of {self.budget}: {statement}"
+            )
+
+    def repeated(self):
+        """Fingerprints run at least SQL_REPEAT_THRESHOLD times, the usual N+1 signature."""
+        return [
+            (shape, count)
+            for shape, count in self.fingerprints.most_common()
+            if count >= SQL_REPEAT_THRESHOLD
+        ]
+
+    def server_timing(self) -> str:
+        total = (time.perf_counter() - self.started) * 1000
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.statements} statements", '
+            f"app;dur={total - self.db_seconds * 1000:.1f}, total;dur={total:.1f}"
+        )
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("sql_request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def query_budget(limit: int):
+    """
+    Route dependency overriding the statement budget, e.g.
+    ``dependencies=[Depends(query_budget(4))]``.
+    """
+
+    def apply():
+        stats = _current.get()
+        if stats is not None:
+            stats.budget = limit
+
+    return apply
+
+
+def instrument(engine):
+    """
+    Times every statement run through ``engine`` and adds it to the current request.
+    Passing the Engine class covers engines that are created later. Safe to call
+    more than once.
+    """
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Pure ASGI middleware collecting per-request SQL statistics.
+
+    The totals go into a ``Server-Timing`` header and one JSON log line per request
+    on the ``app.sql`` logger, at WARNING when the request was slow, repeated a
+    statement SQL_REPEAT_THRESHOLD times or went over its budget.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _log(scope, status, stats)
+
+
+def _log(scope, status: int, stats: RequestStats):
+    duration = (time.perf_counter() - stats.started) * 1000
+    repeated = stats.repeated()
+    over_budget = bool(stats.budget) and stats.statements > stats.budget
+    slow = stats.slowest[0] * 1000 >= SQL_SLOW_MS
+
+    level = logging.WARNING if repeated or over_budget or slow else logging.INFO
+    if not logger.isEnabledFor(level):
+        return
+
+    record = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status,
+        "duration_ms": round(duration, 2),
+        "statements": stats.statements,
+        "db_ms": round(stats.db_seconds * 1000, 2),
+        "slowest_ms": round(stats.slowest[0] * 1000, 2),
+        "slowest": stats.slowest[1] and fingerprint(stats.slowest[1]),
+        "repeated": [{"statement": shape, "count": count} for shape, count in repeated],
+        "budget": stats.budget or None,
+    }
+    logger.log(level, json.dumps(record))
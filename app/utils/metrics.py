@@ -0,0 +1,342 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from typing import Optional
+
+from app.config import METRICS_MULTIPROC_DIR, METRICS_WRITE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestMetrics:
+    """
+    Request counters and latency histograms for this worker.
+
+    Updates are plain dict and int operations made from the event loop thread
+    between awaits, so they need no locks and cost well under a microsecond.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.in_flight = 0
+        self.requests = {}
+        self.durations = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+
+        histogram = self.durations.get((method, route))
+        if histogram is None:
+            histogram = self.durations[(method, route)] = [[0] * (len(self.buckets) + 1), 0.0]
+        histogram[0][bisect_left(self.buckets, seconds)] += 1
+        histogram[1] += seconds
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware feeding request_metrics. Requests are labelled with the
+    route template (``/api/v1/posts/{post_id}/detail/``), never the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        request_metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_metrics.in_flight -= 1
+            request_metrics.observe(
+                scope["method"], route_template(scope), status, time.perf_counter() - started
+            )
+
+
+def route_template(scope) -> str:
+    """
+    The matched route's path template including router prefixes. Routes in included
+    routers only know their own path, so the prefix is taken from the request path
+    by dropping as many segments as the route's template has.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    return scope["path"].rsplit("/", template.count("/"))[0] + template
+
+
+def _family(families, name, kind, help_text):
+    return families.setdefault(name, {"type": kind, "help": help_text, "samples": []})
+
+
+def collect() -> dict:
+    """
+    Gathers this worker's metrics as {name: {"type", "help", "samples": [[labels, value]]}},
+    a JSON-friendly form that snapshots from several workers can be merged in.
+    """
+    from app.database import db_gate, pool_status, replicas
+    from app.utils.auth import _token_cache, _user_cache
+    from app.utils.events import event_broker
+    from app.utils.hashing import hasher
+    from app.utils.pagination import _count_cache
+    from app.utils.purge import user_purger
+    from app.utils.ratelimit import rate_limiter
+    from app.utils.response_cache import response_cache
+
+    families = {}
+    m = request_metrics
+
+    requests = _family(families, "http_requests_total", "counter", "HTTP requests handled.")
+    for (method, route, status), count in m.requests.items():
+        requests["samples"].append([{"method": method, "route": route, "status": str(status)}, count])
+
+    durations = _family(
+        families, "http_request_duration_seconds", "histogram", "HTTP request latency."
+    )
+    for (method, route), (counts, total) in m.durations.items():
+        durations["samples"].append([{"method": method, "route": route}, [list(counts), total]])
+
+    _family(families, "http_requests_in_flight", "gauge", "HTTP requests being handled.")[
+        "samples"
+    ].append([{}, m.in_flight])
+
+    pool = pool_status()
+    for key, name, kind, help_text in (
+        ("size", "db_pool_size", "gauge", "Configured pool size."),
+        ("checked_out", "db_pool_checked_out", "gauge", "Connections checked out."),
+        ("checked_in", "db_pool_checked_in", "gauge", "Idle connections in the pool."),
+        ("overflow", "db_pool_overflow", "gauge", "Overflow connections open."),
+        ("connects", "db_pool_connects_total", "counter", "Connections opened."),
+        ("checkouts", "db_pool_checkouts_total", "counter", "Connection checkouts."),
+        ("invalidations", "db_pool_invalidations_total", "counter", "Connections invalidated."),
+        ("timeouts", "db_pool_timeouts_total", "counter", "Checkouts that timed out."),
+        ("wait_seconds_total", "db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection."),
+    ):
+        if key in pool:
+            _family(families, name, kind, help_text)["samples"].append([{}, pool[key]])
+
+    reads = _family(families, "db_reads_total", "counter", "Read-only sessions by target.")
+    reads["samples"].append([{"target": "primary"}, replicas.primary_reads])
+    reads["samples"].append([{"target": "replica"}, replicas.replica_reads])
+    _family(families, "db_replica_failures_total", "counter", "Replicas taken out of rotation.")[
+        "samples"
+    ].append([{}, replicas.failures])
+    healthy = _family(families, "db_replica_healthy", "gauge", "1 while a replica is in rotation.")
+    for engine in replicas.engines:
+        labels = {"replica": engine.url.render_as_string()}
+        healthy["samples"].append([labels, int(replicas.is_healthy(engine))])
+
+    for name, kind, help_text, value in (
+        ("hash_in_flight", "gauge", "Password hashes running or queued.", hasher.in_flight),
+        ("hash_queue_depth", "gauge", "Password hashes waiting for a worker.", hasher.queue_depth),
+        ("hash_completed_total", "counter", "Password hashes completed.", hasher.completed),
+        ("hash_failed_total", "counter", "Password hashes that failed.", hasher.failed),
+        ("hash_rejected_total", "counter", "Password hashes rejected with 503.", hasher.rejected),
+        ("hash_seconds_total", "counter", "Time spent hashing passwords.", hasher.seconds_total),
+        ("db_gate_in_flight", "gauge", "Requests holding a database session.", db_gate.in_flight),
+        ("db_gate_rejected_total", "counter", "Requests shed with 503 by the database gate.", db_gate.rejected),
+        ("rate_limit_allowed_total", "counter", "Requests let through by a rate limit.", rate_limiter.allowed),
+        ("rate_limit_limited_total", "counter", "Requests refused with 429 by a rate limit.", rate_limiter.limited),
+        ("events_subscribers", "gauge", "Open live event streams.", event_broker.subscriber_count),
+        ("events_published_total", "counter", "Post events published.", event_broker.published),
+        ("events_resyncs_total", "counter", "Event streams that overflowed and were told to resync.", event_broker.resyncs),
+        ("rate_limit_errors_total", "counter", "Rate limit checks skipped after a backend error.", rate_limiter.errors),
+    ):
+        _family(families, name, kind, help_text)["samples"].append([{}, value])
+
+    _family(families, "user_purges_pending", "gauge", "Deleted users waiting to be purged.")[
+        "samples"
+    ].append([{}, user_purger.pending])
+    _family(families, "user_purges_completed_total", "counter", "Background user purges finished.")[
+        "samples"
+    ].append([{}, user_purger.completed])
+    _family(families, "user_purge_failures_total", "counter", "Failed user purge attempts.")[
+        "samples"
+    ].append([{}, user_purger.failures])
+    _family(families, "user_purges_abandoned_total", "counter", "Purges left for next startup.")[
+        "samples"
+    ].append([{}, user_purger.abandoned])
+    purged = _family(families, "user_purge_rows_total", "counter", "Rows deleted by user purges.")
+    for kind, count in sorted(user_purger.removed.items()):
+        purged["samples"].append([{"kind": kind}, count])
+
+    hits = _family(families, "cache_hits_total", "counter", "Cache hits.")
+    misses = _family(families, "cache_misses_total", "counter", "Cache misses.")
+    ratio = _family(families, "cache_hit_ratio", "gauge", "Cache hits over lookups since start.")
+    for cache_name, cache in (
+        ("auth_token", _token_cache),
+        ("auth_user", _user_cache),
+        ("response", response_cache),
+        ("pagination_count", _count_cache),
+    ):
+        labels = {"cache": cache_name}
+        hits["samples"].append([labels, cache.hits])
+        misses["samples"].append([labels, cache.misses])
+        lookups = cache.hits + cache.misses
+        ratio["samples"].append([labels, cache.hits / lookups if lookups else 0.0])
+
+    return families
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_snapshot(directory: str = METRICS_MULTIPROC_DIR):
+    """
+    Writes this worker's metrics to ``<directory>/<pid>.json`` for the other workers
+    to merge; the file is replaced atomically.
+    """
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump({"pid": os.getpid(), "families": collect()}, f)
+    os.replace(path + ".tmp", path)
+
+
+def merge_snapshots(directory: str = METRICS_MULTIPROC_DIR) -> dict:
+    """
+    Merges every worker's snapshot. Counters and histograms are summed, including
+    those of workers that have exited, so totals never go backwards; gauges get a
+    ``pid`` label and are only kept for live workers.
+    """
+    write_snapshot(directory)
+    merged = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        alive = _alive(snapshot["pid"])
+
+        for name, family in snapshot["families"].items():
+            target = merged.setdefault(
+                name, {"type": family["type"], "help": family["help"], "samples": {}}
+            )
+            for labels, value in family["samples"]:
+                if family["type"] == "gauge":
+                    if not alive:
+                        continue
+                    labels = {**labels, "pid": str(snapshot["pid"])}
+                key = json.dumps(labels, sort_keys=True)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value
+                elif family["type"] == "histogram":
+                    counts = [a + b for a, b in zip(current[0], value[0])]
+                    target["samples"][key] = [counts, current[1] + value[1]]
+                else:
+                    target["samples"][key] = current + value
+
+    for family in merged.values():
+        family["samples"] = [[json.loads(key), value] for key, value in family["samples"].items()]
+    return merged
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(families: dict, buckets=LATENCY_BUCKETS) -> str:
+    """
+    Renders metric families in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, family in families.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for labels, value in family["samples"]:
+            if family["type"] != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def exposition() -> str:
+    if METRICS_MULTIPROC_DIR:
+        return render(merge_snapshots())
+    return render(collect())
+
+
+class SnapshotWriter:
+    """
+    Keeps this worker's snapshot in METRICS_MULTIPROC_DIR fresh for the worker that
+    happens to serve /metrics.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                write_snapshot()
+            except OSError:
+                logger.exception("Writing the metrics snapshot failed")
+
+    def start(self):
+        if METRICS_MULTIPROC_DIR and self._task is None:
+            os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            write_snapshot()
+
+
+snapshot_writer = SnapshotWriter(METRICS_WRITE_INTERVAL)
@@ -1,25 +1,204 @@
+import base64
+import json
+from datetime import datetime
+from enum import Enum
 from math import ceil
+from typing import Optional
+
+from fastapi import HTTPException
 from pydantic import BaseModel
-from sqlalchemy.orm import Query
+from sqlalchemy import Select, func, literal, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import PAGINATION_COUNT_CACHE_TTL
+from app.utils.cache import TTLCache
+
+
+class TotalMode(str, Enum):
+    exact = "exact"
+    cached = "cached"
+    estimated = "estimated"
+    none = "none"
+
+
+_count_cache = TTLCache(maxsize=1024, ttl=PAGINATION_COUNT_CACHE_TTL)
+
+
+def encode_cursor(row, keyset, direction: str) -> str:
+    """
+    Encodes the keyset values of a row into an opaque cursor.
+    """
+    values = []
+    for column in keyset:
+        value = getattr(row, column.key)
+        values.append(value.isoformat() if isinstance(value, datetime) else value)
+
+    payload = json.dumps({"d": direction, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _cursor_value(column, value):
+    # a cursor comes back from the client: anything but the column's own type is refused
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if isinstance(value, bool) or not isinstance(value, python_type):
+        raise ValueError(value)
+    return value
+
 
-def paginate(query: Query, page_number: int, page_size: int):
+def decode_cursor(cursor: str, keyset):
     """
-    Paginates a SQLAlchemy query.
+    Decodes a cursor produced by encode_cursor into its direction and keyset values.
     """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        direction, values = payload["d"], payload["v"]
+        if direction not in ("next", "prev") or len(values) != len(keyset):
+            raise ValueError(cursor)
+
+        values = [_cursor_value(column, value) for column, value in zip(keyset, values)]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return direction, values
+
+
+async def _fetch(db: AsyncSession, query: Select):
+    result = await db.execute(query)
+    description = query.column_descriptions
+    if len(description) == 1 and description[0]["expr"] is description[0]["entity"]:
+        return list(result.scalars().all())
+    return list(result.all())
+
+
+async def _exact_count(db: AsyncSession, query: Select) -> int:
+    return await db.scalar(select(func.count()).select_from(query.subquery()))
+
+
+async def _estimated_count(db: AsyncSession, query: Select) -> int:
+    """
+    Reads the planner's row estimate instead of counting (PostgreSQL only).
+    """
+    connection = await db.connection()
+    dialect = connection.dialect
+    if dialect.name != "postgresql":
+        return await _exact_count(db, query)
+
+    compiled = query.compile(dialect=dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    result = await connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _count(db: AsyncSession, query: Select, total: TotalMode) -> Optional[int]:
+    if total == TotalMode.none:
+        return None
+
+    query = query.order_by(None)
+    if total == TotalMode.exact:
+        return await _exact_count(db, query)
+    if total == TotalMode.estimated:
+        return await _estimated_count(db, query)
+
+    compiled = query.compile()
+    key = f"{compiled}|{sorted(compiled.params.items())!r}"
+    total_result = _count_cache.get(key)
+    if total_result is None:
+        total_result = await _exact_count(db, query)
+        _count_cache.set(key, total_result)
+    return total_result
+
+
+async def _paginate_keyset(
+    db: AsyncSession, query: Select, keyset, cursor: str, page_size: int, total: TotalMode
+):
+    direction, values = decode_cursor(cursor, keyset)
+    total_result = await _count(db, query, total)
+
+    key = tuple_(*keyset)
+    bound = tuple_(*[literal(value, column.type) for column, value in zip(keyset, values)])
+    if direction == "next":
+        query = query.where(key < bound).order_by(None).order_by(*[c.desc() for c in keyset])
+    else:
+        query = query.where(key > bound).order_by(None).order_by(*[c.asc() for c in keyset])
+
+    paginated_data = await _fetch(db, query.limit(page_size + 1))
+    has_more = len(paginated_data) > page_size
+    paginated_data = paginated_data[:page_size]
+    if direction == "prev":
+        paginated_data.reverse()
+
+    next_cursor = prev_cursor = None
+    if paginated_data:
+        if direction == "prev" or has_more:
+            next_cursor = encode_cursor(paginated_data[-1], keyset, "next")
+        if direction == "next" or has_more:
+            prev_cursor = encode_cursor(paginated_data[0], keyset, "prev")
+
+    return {
+        "data": paginated_data,
+        "current_result": len(paginated_data),
+        "total_result": total_result,
+        "current_page_number": None,
+        "total_page_number": ceil(total_result / page_size) if total_result is not None else None,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    page_number: int,
+    page_size: int,
+    keyset=None,
+    cursor: Optional[str] = None,
+    total: Optional[TotalMode] = None,
+):
+    """
+    Paginates a SQLAlchemy select statement.
+
+    When ``keyset`` is given (the descending ORDER BY columns, ending with ``id``)
+    every page also carries opaque ``next``/``prev`` cursors. Passing one of them
+    back as ``cursor`` seeks straight to the neighbouring page instead of counting
+    and skipping the rows before it, so deep pages cost the same as the first one.
+    ``total`` picks how the total is obtained; cursor pages skip it by default.
+    """
+    if cursor is not None:
+        if keyset is None:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not supported here")
+        return await _paginate_keyset(
+            db, query, keyset, cursor, page_size, total or TotalMode.none
+        )
+
     # Calculate total count
-    total_result = query.count()
+    total_result = await _count(db, query, total or TotalMode.exact)
 
-    # Offset and Limit for pagination
+    # Offset and Limit for pagination, one extra row tells whether a next page exists
     offset = (page_number - 1) * page_size
-    paginated_query = query.offset(offset).limit(page_size)
+    paginated_query = query.offset(offset).limit(page_size + 1)
 
     # Execute paginated query
-    paginated_data = paginated_query.all()
+    paginated_data = await _fetch(db, paginated_query)
+    has_more = len(paginated_data) > page_size
+    paginated_data = paginated_data[:page_size]
 
     # Total pages
-    total_page_number = ceil(total_result / page_size)
+    total_page_number = ceil(total_result / page_size) if total_result is not None else None
+
+    next_cursor = prev_cursor = None
+    if keyset is not None and paginated_data:
+        if has_more:
+            next_cursor = encode_cursor(paginated_data[-1], keyset, "next")
+        if page_number > 1:
+            prev_cursor = encode_cursor(paginated_data[0], keyset, "prev")
 
     # Return pagination response
     return {
@@ -28,10 +207,27 @@ def paginate(query: Query, page_number: int, page_size: int):
         "total_result": total_result,
         "current_page_number": page_number,
         "total_page_number": total_page_number,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
     }
 
 
 class PaginationMeta(BaseModel):
-    current_page: int
-    total_pages: int
-    total_results: int
+    current_page: Optional[int] = None
+    total_pages: Optional[int] = None
+    total_results: Optional[int] = None
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def pagination_meta(paginated: dict) -> PaginationMeta:
+    """
+    Builds the response meta block from the result of paginate.
+    """
+    return PaginationMeta(
+        current_page=paginated["current_page_number"],
+        total_pages=paginated["total_page_number"],
+        total_results=paginated["total_result"],
+        next_cursor=paginated["next_cursor"],
+        prev_cursor=paginated["prev_cursor"],
+    )
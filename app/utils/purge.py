@@ -0,0 +1,290 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import aliased
+
+from app.config import PURGE_CHUNK_SIZE, PURGE_MAX_ATTEMPTS, PURGE_PAUSE
+from app.database import SessionLocal
+from app.models.post import Comment, Post, Vote
+from app.models.user import User
+from app.utils.counters import adjust_post_counters, refresh_post_caches
+from app.utils.threads import in_subtree, remove_subtrees
+
+logger = logging.getLogger(__name__)
+
+
+def _owned(user_id: int) -> list:
+    """
+    (kind, select of ids) for every row a purge deletes, each row counted once:
+    the votes and comments on the user's posts, the posts, the user's votes on
+    other posts and their comments elsewhere with all the replies below them.
+    """
+    own_posts = select(Post.id).where(Post.author_id == user_id)
+    return [
+        ("votes", select(Vote.id).where(Vote.post_id.in_(own_posts))),
+        ("comments", select(Comment.id).where(Comment.post_id.in_(own_posts))),
+        ("posts", own_posts),
+        (
+            "votes",
+            select(Vote.id).where(Vote.user_id == user_id, Vote.post_id.not_in(own_posts)),
+        ),
+        ("comments", _below_comments(user_id).where(Comment.post_id.not_in(own_posts))),
+    ]
+
+
+def _below_comments(user_id: int):
+    # the user's comments and every reply below them, whoever wrote those
+    mine = aliased(Comment)
+    return (
+        select(Comment.id)
+        .join(mine, in_subtree(mine))
+        .where(mine.author_id == user_id)
+        .distinct()
+    )
+
+
+async def owned_rows(db, user_id: int, limit: Optional[int] = None) -> dict:
+    """
+    Counts the posts, comments and votes a purge of the user still has to delete,
+    each part stopping at ``limit`` when given so that sizing up a prolific user
+    stays cheap.
+    """
+    counts = dict.fromkeys(("posts", "comments", "votes"), 0)
+    for kind, query in _owned(user_id):
+        if limit is not None:
+            query = query.limit(limit)
+        counts[kind] += await db.scalar(select(func.count()).select_from(query.subquery()))
+    return counts
+
+
+# Each step deletes at most ``limit`` rows and returns how many it deleted with
+# {post_id: new counters, or None for a deleted post} for the caches to follow.
+# The user's own posts are emptied first, children before parents, so the
+# database cascades never reach past a chunk.
+
+
+async def _own_post_votes(db, user_id: int, limit: int):
+    chunk = (
+        select(Vote.id)
+        .join(Post, Post.id == Vote.post_id)
+        .where(Post.author_id == user_id)
+        .limit(limit)
+    )
+    result = await db.execute(delete(Vote).where(Vote.id.in_(chunk)))
+    return result.rowcount, {}
+
+
+async def _own_post_comments(db, user_id: int, limit: int):
+    # a reply always has a higher id than its parent, so newest first deletes leaves first
+    chunk = (
+        select(Comment.id)
+        .join(Post, Post.id == Comment.post_id)
+        .where(Post.author_id == user_id)
+        .order_by(Comment.id.desc())
+        .limit(limit)
+    )
+    result = await db.execute(delete(Comment).where(Comment.id.in_(chunk)))
+    return result.rowcount, {}
+
+
+async def _own_posts(db, user_id: int, limit: int):
+    chunk = select(Post.id).where(Post.author_id == user_id).limit(limit)
+    result = await db.execute(delete(Post).where(Post.id.in_(chunk)).returning(Post.id))
+    post_ids = result.scalars().all()
+    return len(post_ids), dict.fromkeys(post_ids)
+
+
+async def _votes(db, user_id: int, limit: int):
+    chunk = (
+        select(Vote.id, Vote.post_id)
+        .where(Vote.user_id == user_id)
+        .order_by(Vote.id)
+        .limit(limit)
+        .subquery()
+    )
+    per_post = (
+        select(chunk.c.post_id, func.count().label("n")).group_by(chunk.c.post_id).subquery()
+    )
+    counts = await db.execute(
+        adjust_post_counters(per_post.c.post_id, vote_count=-per_post.c.n).returning(
+            Post.id, Post.vote_count
+        )
+    )
+    posts = {post_id: {"vote_count": vote_count} for post_id, vote_count in counts}
+    result = await db.execute(delete(Vote).where(Vote.id.in_(select(chunk.c.id))))
+    return result.rowcount, posts
+
+
+async def _comments(db, user_id: int, limit: int):
+    # a reply always has a higher id than its parent, so taking the highest ids
+    # deletes leaves first and every chunk holds whatever was below its comments
+    chunk = (
+        await db.scalars(_below_comments(user_id).order_by(Comment.id.desc()).limit(limit))
+    ).all()
+    if not chunk:
+        return 0, {}
+    counts = await remove_subtrees(
+        db, select(Comment.root_id, Comment.path).where(Comment.id.in_(chunk))
+    )
+    return len(chunk), {
+        post_id: {"comment_count": comment_count} for post_id, comment_count in counts
+    }
+
+
+PURGE_STEPS = (
+    ("votes", _own_post_votes),
+    ("comments", _own_post_comments),
+    ("posts", _own_posts),
+    ("votes", _votes),
+    ("comments", _comments),
+)
+
+
+async def delete_user_rows(db, user_id: int) -> dict:
+    """
+    Runs every purge step without a limit, in the caller's transaction, for
+    users small enough to delete in one go. Returns the posts touched.
+    """
+    touched = {}
+    for _, step in PURGE_STEPS:
+        _, posts = await step(db, user_id, None)
+        for post_id, counters in posts.items():
+            if counters is None:
+                touched[post_id] = None
+            else:
+                touched.setdefault(post_id, {}).update(counters)
+    return touched
+
+
+class UserPurger:
+    """
+    Deletes hidden users (deleted_at set) and everything they own in the background.
+
+    Every chunk is its own short transaction, holding the user's row lock so that
+    two workers resuming the same purge take turns, with a pause in between so
+    the purge yields to regular traffic. A purge that fails goes to the back of
+    the queue, with a growing pause, so it never holds up the others; after
+    ``max_attempts`` failures in a row it is dropped. The user stays hidden and
+    users found hidden at startup are picked up again.
+    """
+
+    def __init__(self, session_factory, chunk_size: int, pause: float, max_attempts: int):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.max_attempts = max_attempts
+        self.removed = Counter()
+        self.completed = 0
+        self.failures = 0
+        self.abandoned = 0
+        self._attempts = Counter()
+        self._pending = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def schedule(self, user_id: int):
+        if user_id not in self._pending:
+            self._pending.append(user_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def resume(self):
+        async with self.session_factory() as db:
+            for user_id in await db.scalars(
+                select(User.id).where(User.deleted_at.is_not(None)).order_by(User.deleted_at)
+            ):
+                self.schedule(user_id)
+
+    async def _step(self, user_id: int, step) -> Optional[int]:
+        """
+        Runs one chunk of ``step``; returns the rows it deleted, or None once
+        the user is gone.
+        """
+        async with self.session_factory() as db:
+            locked = await db.scalar(
+                select(User.id).where(User.id == user_id).with_for_update()
+            )
+            if locked is None:
+                return None
+            removed, posts = await step(db, user_id, self.chunk_size)
+            await db.commit()
+        await refresh_post_caches(posts)
+        return removed
+
+    async def purge(self, user_id: int):
+        for kind, step in PURGE_STEPS:
+            while True:
+                removed = await self._step(user_id, step)
+                if removed is None:
+                    return
+                self.removed[kind] += removed
+                if not removed:
+                    break
+                await asyncio.sleep(self.pause)
+
+        async with self.session_factory() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        self.completed += 1
+        logger.info("purged user %s", user_id)
+
+    async def _run(self):
+        try:
+            await self.resume()
+        except Exception:
+            logger.exception("Looking for unfinished user purges failed")
+
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                user_id = self._pending[0]
+                try:
+                    await self.purge(user_id)
+                except Exception:
+                    await self._retry_later(user_id)
+                    continue
+                self._pending.remove(user_id)
+                self._attempts.pop(user_id, None)
+
+    async def _retry_later(self, user_id: int):
+        self._pending.remove(user_id)
+        self.failures += 1
+        self._attempts[user_id] += 1
+        attempts = self._attempts[user_id]
+        if attempts >= self.max_attempts:
+            self.abandoned += 1
+            del self._attempts[user_id]
+            logger.exception(
+                "Purging user %s failed %d times, left for the next startup", user_id, attempts
+            )
+        else:
+            logger.exception("Purging user %s failed, retrying later", user_id)
+            self._pending.append(user_id)
+        await asyncio.sleep(min(self.pause * 2**attempts, 60))
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            if self._pending:
+                self._wakeup.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+user_purger = UserPurger(SessionLocal, PURGE_CHUNK_SIZE, PURGE_PAUSE, PURGE_MAX_ATTEMPTS)
@@ -0,0 +1,189 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request
+
+from app.config import (
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_TRUST_FORWARDED,
+    RATE_LIMITS,
+    REDIS_URL,
+)
+from app.utils.auth import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rate_limits(spec: str) -> dict:
+    """
+    Parses "login=10/60,vote=120/60" into {name: (requests, seconds)}.
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rule = item.partition("=")
+        requests, _, seconds = rule.partition("/")
+        limits[name.strip()] = (int(requests), float(seconds or 1))
+    return limits
+
+
+def client_key(request: Request, trust_forwarded: bool = RATE_LIMIT_TRUST_FORWARDED) -> str:
+    """
+    "user:<id>" for requests carrying a valid token, else "ip:<client address>".
+    """
+    token = request.query_params.get("token")
+    if token:
+        try:
+            payload = decode_access_token(token)
+        except HTTPException:
+            payload = None
+        subject = payload and (payload.get("user_id") or payload.get("sub"))
+        if subject:
+            return f"user:{subject}"
+
+    forwarded = request.headers.get("x-forwarded-for")
+    if trust_forwarded and forwarded:
+        return "ip:" + forwarded.split(",")[0].strip()
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+class MemoryRateLimitBackend:
+    """
+    Token buckets kept in this worker, least recently used ones evicted past ``maxsize``.
+    """
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+
+    async def take(self, key: str, burst: int, rate: float) -> float:
+        """
+        Takes a token from the bucket; returns 0, or the seconds until one is available.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# The bucket is refilled and taken from in one step, on the server's clock
+TAKE_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Token buckets shared by all workers.
+
+    ``client`` is anything with redis.asyncio's eval coroutine, so a local fake
+    can stand in for a Redis server.
+    """
+
+    def __init__(self, client, prefix: str = "blog:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def take(self, key: str, burst: int, rate: float) -> float:
+        wait = await self.client.eval(TAKE_SCRIPT, 1, self.prefix + key, burst, rate)
+        return float(wait.decode() if isinstance(wait, bytes) else wait)
+
+
+class RateLimiter:
+    """
+    Applies the named limits from RATE_LIMITS to requests.
+
+    Requests carrying a valid token share a bucket per user, the rest one per
+    client IP. If the backend fails the request is let through, the limiter
+    should never be the reason an endpoint is down.
+    """
+
+    def __init__(self, backend, limits: dict, trust_forwarded: bool = False):
+        self.backend = backend
+        self.limits = limits
+        self.trust_forwarded = trust_forwarded
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+
+    async def check(self, name: str, request: Request):
+        limit = self.limits.get(name)
+        if self.backend is None or limit is None:
+            return
+
+        requests, seconds = limit
+        try:
+            wait = await self.backend.take(
+                f"{name}:{client_key(request, self.trust_forwarded)}", requests, requests / seconds
+            )
+        except Exception:
+            self.errors += 1
+            logger.warning("rate limit backend failed, letting the request through", exc_info=True)
+            return
+
+        if wait > 0:
+            self.limited += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+        self.allowed += 1
+
+
+def rate_limit(name: str):
+    """
+    Route dependency enforcing the RATE_LIMITS entry called ``name``, e.g.
+    ``dependencies=[Depends(rate_limit("login"))]``. Unlisted names are not limited.
+    """
+
+    async def dependency(request: Request):
+        await rate_limiter.check(name, request)
+
+    return dependency
+
+
+def _create_backend():
+    if not RATE_LIMIT_ENABLED:
+        return None
+    if RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimitBackend()
+    if RATE_LIMIT_BACKEND == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the 'redis' package")
+        return RedisRateLimitBackend(redis.from_url(REDIS_URL))
+    return None
+
+
+rate_limiter = RateLimiter(
+    _create_backend(), parse_rate_limits(RATE_LIMITS), trust_forwarded=RATE_LIMIT_TRUST_FORWARDED
+)
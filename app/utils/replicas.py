@@ -0,0 +1,103 @@
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import AUTH_CACHE_SIZE, DB_READ_YOUR_WRITES_SECONDS
+from app.database import SessionLocal, db_gate, get_engine, replicas
+from app.schemas.user import UserResponse
+from app.utils.auth import get_current_user
+from app.utils.cache import TTLCache
+from app.utils.ratelimit import client_key
+
+# Clients (keyed like the rate limiter) that wrote recently and must read from the primary
+_recent_writers = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=DB_READ_YOUR_WRITES_SECONDS)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def reads_own_writes(request: Request) -> bool:
+    """
+    True while the client is pinned to the primary after a write; such requests
+    should skip the response cache, which replica reads may have filled.
+    """
+    return getattr(request.state, "read_your_writes", False)
+
+
+def reads_replica(request: Request) -> bool:
+    """
+    True when the request's read session is on a replica. What it reads may lag
+    behind the response cache's version keys, so it must not fill the cache.
+    """
+    return getattr(request.state, "on_replica", False)
+
+
+async def get_read_db(request: Request):
+    """
+    Session for read-only handlers, on a healthy replica when there is one.
+
+    Falls back to the primary without replicas, when none is healthy, or for
+    DB_READ_YOUR_WRITES_SECONDS after the client's last write.
+    """
+    engine = None
+    if replicas.urls:
+        request.state.read_your_writes = bool(_recent_writers.get(client_key(request)))
+        if not request.state.read_your_writes:
+            engine = replicas.choose()
+        if engine is None:
+            replicas.primary_reads += 1
+        else:
+            replicas.replica_reads += 1
+
+    request.state.on_replica = engine is not None
+
+    get_engine()
+    db_gate.acquire()
+    try:
+        async with (SessionLocal(bind=engine) if engine else SessionLocal()) as db:
+            try:
+                yield db
+            except (exc.OperationalError, exc.InterfaceError, OSError):
+                if engine is not None:
+                    replicas.mark_down(engine)
+                raise
+    finally:
+        db_gate.release()
+
+
+async def get_current_reader(
+    token: str, request: Request, db: AsyncSession = Depends(get_read_db)
+) -> UserResponse:
+    """
+    get_current_user for read-only routes: looks the user up on the route's read
+    session rather than taking a second gated session on the primary.
+    """
+    try:
+        return await get_current_user(token, db)
+    except HTTPException as error:
+        if error.status_code != 404 or not reads_replica(request):
+            raise
+    # registered after the replica last caught up
+    async with SessionLocal() as primary:
+        return await get_current_user(token, primary)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins a client to the primary once one of its writes has succeeded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                # before the response goes out, so the client's next read already sees it
+                _recent_writers.set(client_key(Request(scope)), True)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
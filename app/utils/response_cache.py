@@ -0,0 +1,92 @@
+import hashlib
+import uuid
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.config import (
+    REDIS_URL,
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+)
+from app.utils.cache import MemoryCacheBackend, RedisCacheBackend
+
+
+class ResponseCache:
+    """
+    Read-through cache of serialised per-post responses.
+
+    Keys embed a version token stored under ``post:<id>:version``; writes replace
+    the token, which invalidates every cached page of that post at once without
+    having to know their keys. The orphaned entries simply expire.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def _version(self, post_id: int) -> str:
+        key = f"post:{post_id}:version"
+        version = await self.backend.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            await self.backend.set(key, version, ttl=RESPONSE_CACHE_TTL * 10)
+        return version.decode() if isinstance(version, bytes) else version
+
+    async def key(self, post_id: int, name: str) -> Optional[str]:
+        if self.backend is None:
+            return None
+        return f"post:{post_id}:{await self._version(post_id)}:{name}"
+
+    async def get(self, key: Optional[str]):
+        """
+        Returns (etag, body) for a cached response, or None.
+        """
+        if not key:
+            return None
+        entry = await self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        etag, _, body = entry.partition(b"\n")
+        return etag.decode(), body
+
+    async def set(self, key: Optional[str], body: bytes) -> str:
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        if key:
+            await self.backend.set(key, etag.encode() + b"\n" + body)
+        return etag
+
+    async def invalidate(self, post_id: int):
+        if self.backend is not None:
+            await self.backend.set(
+                f"post:{post_id}:version", uuid.uuid4().hex, ttl=RESPONSE_CACHE_TTL * 10
+            )
+
+
+def etag_response(request: Request, etag: str, body: bytes) -> Response:
+    """
+    Answers 304 when the client already holds this representation, else the body.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", "").split(", "):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _create_backend():
+    if RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+    if RESPONSE_CACHE_BACKEND == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the 'redis' package")
+        return RedisCacheBackend(redis.from_url(REDIS_URL), ttl=RESPONSE_CACHE_TTL)
+    return None
+
+
+response_cache = ResponseCache(_create_backend())
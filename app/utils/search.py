@@ -0,0 +1,190 @@
+import re
+from types import SimpleNamespace
+from typing import Optional
+
+from sqlalchemy import Float, Integer, String, and_, func, literal, literal_column, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.post import Comment, Post
+from app.utils.pagination import TotalMode, decode_cursor, encode_cursor, paginate
+
+
+SEARCH_CONFIG = "english"
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+SNIPPET_LENGTH = 200
+
+# Generated by the search migration and deliberately left off the models, so
+# loading a Post or Comment never drags the tsvector along and create_all still
+# works on SQLite; alembic/env.py keeps autogenerate from dropping them.
+post_search_vector = literal_column("posts.search_vector")
+comment_search_vector = literal_column("comments.search_vector")
+
+
+async def search(
+    db: AsyncSession,
+    q: str,
+    page_size: int,
+    cursor: Optional[str] = None,
+    include_comments: bool = False,
+    highlight: bool = True,
+):
+    """
+    Ranked full-text search over posts (and optionally comments).
+
+    Hits are ordered by rank, then kind, then id, all descending, which is also the
+    keyset the cursors page on. Returns the same dict as paginate.
+    """
+    connection = await db.connection()
+    if connection.dialect.name == "postgresql":
+        return await _search_postgres(db, q, page_size, cursor, include_comments, highlight)
+    return await _search_fallback(db, q, page_size, cursor, include_comments, highlight)
+
+
+async def _search_postgres(db, q, page_size, cursor, include_comments, highlight):
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    hits = [
+        select(
+            literal("post", String).label("kind"),
+            Post.id.label("id"),
+            Post.id.label("post_id"),
+            Post.title.label("title"),
+            Post.content.label("content"),
+            func.ts_rank(post_search_vector, query, type_=Float).label("rank"),
+        ).where(post_search_vector.op("@@")(query))
+    ]
+    if include_comments:
+        hits.append(
+            select(
+                literal("comment", String).label("kind"),
+                Comment.id.label("id"),
+                Comment.post_id.label("post_id"),
+                Post.title.label("title"),
+                Comment.content.label("content"),
+                func.ts_rank(comment_search_vector, query, type_=Float).label("rank"),
+            )
+            .join(Post, Post.id == Comment.post_id)
+            .where(comment_search_vector.op("@@")(query))
+        )
+
+    hits = union_all(*hits).subquery() if len(hits) > 1 else hits[0].subquery()
+    keyset = (hits.c.rank, hits.c.kind, hits.c.id)
+
+    # the headline is computed in the outer select so only the returned page pays for it
+    if highlight:
+        snippet = func.ts_headline(
+            SEARCH_CONFIG, hits.c.content, query, HEADLINE_OPTIONS, type_=String
+        )
+    else:
+        snippet = func.substr(hits.c.content, 1, SNIPPET_LENGTH)
+
+    statement = select(
+        hits.c.kind,
+        hits.c.id,
+        hits.c.post_id,
+        hits.c.title,
+        snippet.label("snippet"),
+        hits.c.rank,
+    ).order_by(*[column.desc() for column in keyset])
+
+    return await paginate(
+        db, statement, 1, page_size, keyset=keyset, cursor=cursor, total=TotalMode.none
+    )
+
+
+# Fallback for databases without tsvector support (SQLite in development and tests).
+# Terms are matched as case-insensitive substrings, every term has to appear, and the
+# rank weighs title matches like the "A" weight of the generated column.
+FALLBACK_KEYSET = (
+    literal_column("rank", Float),
+    literal_column("kind", String),
+    literal_column("id", Integer),
+)
+
+
+def search_terms(q: str):
+    return [term for term in re.findall(r"\w+", q.lower()) if term]
+
+
+def _contains(column, term: str):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.ilike(f"%{escaped}%", escape="\\")
+
+
+def rank_text(terms, title: str, content: str) -> float:
+    title, content = title.lower(), content.lower()
+    score = sum(title.count(term) * 1.0 + content.count(term) * 0.4 for term in terms)
+    return round(score / (1 + len(content.split()) / 100), 6)
+
+
+def highlight_text(terms, text: str, length: int = SNIPPET_LENGTH) -> str:
+    pattern = re.compile(r"\w*(?:%s)\w*" % "|".join(map(re.escape, terms)), re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(0, match.start() - length // 4) if match else 0
+    window = text[start:start + length]
+    return pattern.sub(lambda m: f"<mark>{m.group(0)}</mark>", window)
+
+
+async def _search_fallback(db, q, page_size, cursor, include_comments, highlight):
+    terms = search_terms(q)
+    hits = []
+    if terms:
+        result = await db.execute(
+            select(Post.id, Post.title, Post.content).where(
+                and_(*[or_(_contains(Post.title, t), _contains(Post.content, t)) for t in terms])
+            )
+        )
+        for id, title, content in result:
+            hits.append(("post", id, id, title, content, rank_text(terms, title, content)))
+
+        if include_comments:
+            result = await db.execute(
+                select(Comment.id, Comment.post_id, Post.title, Comment.content)
+                .join(Post, Post.id == Comment.post_id)
+                .where(and_(*[_contains(Comment.content, t) for t in terms]))
+            )
+            for id, post_id, title, content in result:
+                hits.append(("comment", id, post_id, title, content, rank_text(terms, "", content)))
+
+    hits = [
+        SimpleNamespace(
+            kind=kind,
+            id=id,
+            post_id=post_id,
+            title=title,
+            snippet=highlight_text(terms, content) if highlight else content[:SNIPPET_LENGTH],
+            rank=rank,
+        )
+        for kind, id, post_id, title, content, rank in hits
+    ]
+    hits.sort(key=lambda hit: (hit.rank, hit.kind, hit.id), reverse=True)
+
+    direction = "next"
+    if cursor is not None:
+        direction, values = decode_cursor(cursor, FALLBACK_KEYSET)
+        bound = tuple(values)
+        if direction == "next":
+            hits = [hit for hit in hits if (hit.rank, hit.kind, hit.id) < bound]
+        else:
+            hits = [hit for hit in hits if (hit.rank, hit.kind, hit.id) > bound][::-1]
+
+    has_more = len(hits) > page_size
+    page = hits[:page_size]
+    if direction == "prev":
+        page.reverse()
+
+    next_cursor = prev_cursor = None
+    if page:
+        if direction == "prev" or has_more:
+            next_cursor = encode_cursor(page[-1], FALLBACK_KEYSET, "next")
+        if cursor is not None and (direction == "next" or has_more):
+            prev_cursor = encode_cursor(page[0], FALLBACK_KEYSET, "prev")
+
+    return {
+        "data": page,
+        "current_result": len(page),
+        "total_result": None,
+        "current_page_number": None if cursor is not None else 1,
+        "total_page_number": None,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
@@ -0,0 +1,26 @@
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def columns_for(schema, entity):
+    """
+    Returns the entity's columns for every field of a response schema.
+
+    Selecting these gives plain rows that validate straight into the schema
+    (``from_attributes``) without building and tracking ORM objects first.
+    """
+    return tuple(getattr(entity, name) for name in schema.model_fields)
+
+
+def json_response(model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Serialises a validated response model to JSON once, in pydantic-core.
+
+    Returning a Response skips FastAPI's second validation and serialisation pass
+    against ``response_model``, which then only documents the endpoint.
+    """
+    return Response(
+        model.__pydantic_serializer__.to_json(model),
+        status_code=status_code,
+        media_type="application/json",
+    )
@@ -0,0 +1,261 @@
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import Select, and_, bindparam, delete, exists, func, or_, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.config import COMMENT_MAX_DEPTH
+from app.models.post import Comment, Post
+from app.schemas.post import CommentRespond
+from app.utils.counters import adjust_post_counters
+from app.utils.pagination import paginate
+from app.utils.serialization import columns_for
+
+# Digits per id in Comment.path; zero padding makes text order follow the tree
+PATH_WIDTH = 10
+
+
+def path_segment(comment_id: int) -> str:
+    return str(comment_id).zfill(PATH_WIDTH)
+
+
+def in_subtree(top):
+    """
+    Matches the comments at or below ``top``, anything with root_id and path columns.
+    """
+    return and_(
+        Comment.root_id == top.root_id,
+        or_(Comment.path == top.path, Comment.path.startswith(top.path + ".")),
+    )
+
+
+async def load_parents(db: AsyncSession, parent_ids) -> dict:
+    """
+    Reads what placing a reply needs to know about its parents, keyed by id.
+    """
+    if not parent_ids:
+        return {}
+    result = await db.execute(
+        select(Comment.id, Comment.post_id, Comment.root_id, Comment.path, Comment.depth).where(
+            Comment.id.in_(parent_ids)
+        )
+    )
+    return {row.id: row for row in result.all()}
+
+
+def reply_error(parent, post_id: int) -> Optional[str]:
+    if parent is None or parent.post_id != post_id:
+        return "Parent comment not found"
+    if parent.depth + 1 > COMMENT_MAX_DEPTH:
+        return "Replies are nested too deeply"
+    return None
+
+
+async def place_comments(db: AsyncSession, placed):
+    """
+    Fills in root_id, path and depth for comments just inserted, given as
+    (comment_id, parent) pairs with parent None for top comments, and counts
+    each reply once in the reply_count of every comment above it.
+    """
+    values, ancestors = [], Counter()
+    for comment_id, parent in placed:
+        if parent is None:
+            values.append(
+                {"id": comment_id, "root_id": comment_id, "path": path_segment(comment_id), "depth": 0}
+            )
+        else:
+            values.append(
+                {
+                    "id": comment_id,
+                    "root_id": parent.root_id,
+                    "path": f"{parent.path}.{path_segment(comment_id)}",
+                    "depth": parent.depth + 1,
+                }
+            )
+            ancestors.update(int(segment) for segment in parent.path.split("."))
+
+    await db.execute(update(Comment), values)
+    if ancestors:
+        comments = Comment.__table__
+        await db.execute(
+            update(comments)
+            .where(comments.c.id == bindparam("ancestor_id"))
+            .values(reply_count=comments.c.reply_count + bindparam("replies")),
+            [{"ancestor_id": id_, "replies": n} for id_, n in ancestors.items()],
+        )
+
+
+async def remove_subtrees(db: AsyncSession, tops: Select):
+    """
+    Deletes the comments selected by ``tops`` (a select of root_id and path) with
+    every reply below them, fixing the reply counts of the comments left above
+    and the posts' comment counts. Returns (post_id, comment_count) per post touched.
+    """
+    top = tops.subquery()
+    removed = (
+        select(Comment.id, Comment.post_id, Comment.root_id, Comment.path)
+        .where(exists().where(in_subtree(top.c)))
+        .subquery()
+    )
+
+    above = aliased(Comment)
+    replies_lost = (
+        select(above.id, func.count().label("n"))
+        .join(
+            removed,
+            and_(removed.c.root_id == above.root_id, removed.c.path.startswith(above.path + ".")),
+        )
+        .where(above.id.not_in(select(removed.c.id)))
+        .group_by(above.id)
+        .subquery()
+    )
+    await db.execute(
+        update(Comment)
+        .where(Comment.id == replies_lost.c.id)
+        .values(reply_count=Comment.reply_count - replies_lost.c.n)
+        .execution_options(synchronize_session=False)
+    )
+
+    per_post = (
+        select(removed.c.post_id, func.count().label("n")).group_by(removed.c.post_id).subquery()
+    )
+    counts = await db.execute(
+        adjust_post_counters(per_post.c.post_id, comment_count=-per_post.c.n).returning(
+            Post.id, Post.comment_count
+        )
+    )
+    counts = counts.all()
+
+    await db.execute(
+        delete(Comment)
+        .where(Comment.id.in_(select(removed.c.id)))
+        .execution_options(synchronize_session=False)
+    )
+    return counts
+
+
+def nest(tops, replies) -> list:
+    """
+    Hangs ``replies`` (in path order, so parents come first) under their parents
+    and returns ``tops`` as CommentThread shaped dicts.
+    """
+    nodes, threads = {}, []
+    for row in tops:
+        nodes[row.id] = {**row._mapping, "replies": []}
+        threads.append(nodes[row.id])
+    for row in replies:
+        parent = nodes.get(row.parent_id)
+        if parent is not None:
+            nodes[row.id] = {**row._mapping, "replies": []}
+            parent["replies"].append(nodes[row.id])
+    return threads
+
+
+def first_replies(dialect: str, columns, root_ids, replies: int) -> Select:
+    """
+    The first ``replies`` replies of each thread in ``root_ids``, in path order.
+
+    Each thread is read along the root_id, path index and stops after its own
+    ``replies`` rows: through a LATERAL subquery on PostgreSQL, and on SQLite,
+    which has none, by looking up the path of each thread's last wanted reply
+    first and reading up to it.
+    """
+    roots = select(Comment.id, Comment.path).where(Comment.id.in_(root_ids)).subquery("roots")
+    in_thread = and_(Comment.root_id == roots.c.id, Comment.path > roots.c.path)
+
+    if dialect == "postgresql":
+        first = (
+            select(*columns, Comment.path)
+            .where(in_thread)
+            .order_by(Comment.path)
+            .limit(replies)
+            .lateral("first_replies")
+        )
+        return select(first).select_from(roots).join(first, true()).order_by(first.c.path)
+
+    last_path = (
+        select(Comment.path)
+        .where(in_thread)
+        .order_by(Comment.path)
+        .limit(1)
+        .offset(replies - 1)
+        .scalar_subquery()
+    )
+    # threads with fewer replies read to the end: "/" sorts right after "."
+    last_path = func.coalesce(last_path, roots.c.path + "/")
+    bounds = select(roots.c.id, roots.c.path, last_path.label("last_path")).subquery("bounds")
+    return (
+        select(*columns, Comment.path)
+        .join(
+            bounds,
+            and_(
+                Comment.root_id == bounds.c.id,
+                Comment.path > bounds.c.path,
+                Comment.path <= bounds.c.last_path,
+            ),
+        )
+        .order_by(Comment.path)
+    )
+
+
+async def list_threads(
+    db: AsyncSession,
+    post_id: int,
+    page: int,
+    page_size: int,
+    cursor: Optional[str],
+    total,
+    replies: int,
+):
+    """
+    A page of a post's top comments, newest first, each with the first ``replies``
+    replies of its thread in reading order.
+
+    The top comments page like any other listing; the replies of the whole page
+    come from one more query, see first_replies.
+    """
+    columns = columns_for(CommentRespond, Comment)
+    query = (
+        select(*columns)
+        .where(Comment.post_id == post_id, Comment.parent_id.is_(None))
+        .order_by(Comment.created_at.desc(), Comment.id.desc())
+    )
+    paginated = await paginate(
+        db,
+        query,
+        page,
+        page_size,
+        keyset=(Comment.created_at, Comment.id),
+        cursor=cursor,
+        total=total,
+    )
+
+    reply_rows = []
+    root_ids = [row.id for row in paginated["data"]]
+    if replies and root_ids:
+        result = await db.execute(
+            first_replies(db.get_bind().dialect.name, columns, root_ids, replies)
+        )
+        reply_rows = result.all()
+
+    paginated["data"] = nest(paginated["data"], reply_rows)
+    return paginated
+
+
+async def fetch_thread(db: AsyncSession, comment_id: int, limit: int):
+    """
+    A comment with the replies below it, up to ``limit`` rows in reading order,
+    in one query; None if the comment does not exist.
+    """
+    top = select(Comment.root_id, Comment.path).where(Comment.id == comment_id).subquery()
+    result = await db.execute(
+        select(*columns_for(CommentRespond, Comment))
+        .join(top, in_subtree(top.c))
+        .order_by(Comment.path)
+        .limit(limit)
+    )
+    rows = result.all()
+    if not rows:
+        return None
+    return nest(rows[:1], rows[1:])[0]
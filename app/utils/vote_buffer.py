@@ -0,0 +1,217 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import delete, exists, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import VOTE_FLUSH_INTERVAL, VOTE_FLUSH_SIZE
+from app.database import SessionLocal
+from app.models.post import Post, Vote
+from app.utils.counters import adjust_post_counters
+from app.utils.response_cache import response_cache
+from app.utils.votes import cast_vote, dialect_insert, retract_vote
+
+logger = logging.getLogger(__name__)
+
+
+async def read_vote_state(db: AsyncSession, post_id: int, user_id: int):
+    """
+    Returns (vote_count, has_voted) for a post in one query, or None if the post is missing.
+    """
+    has_voted = exists().where(Vote.post_id == Post.id, Vote.user_id == user_id)
+    result = await db.execute(select(Post.vote_count, has_voted).where(Post.id == post_id))
+    return result.first()
+
+
+class VoteBuffer:
+    """
+    Write-behind buffer for votes.
+
+    Actions are de-duplicated per (post_id, user_id), keeping the latest wanted
+    state next to the state the database had when the key was first buffered, so
+    a vote that is undone before the flush never reaches the database. A flush
+    writes every pending vote with one INSERT ... ON CONFLICT DO NOTHING and every
+    pending unvote with one DELETE, then applies a single counter delta per post.
+
+    The batch being flushed stays visible (``_flushing``) until its commit returns,
+    so a user's vote never seems to vanish while it is on its way to the database.
+    """
+
+    def __init__(self, session_factory, flush_size: int, flush_interval: float):
+        self.session_factory = session_factory
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self.flushed_rows = 0
+        self._pending = {}
+        self._flushing = {}
+        self._size = 0
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return self._size
+
+    def add(self, post_id: int, user_id: int, voted: bool, stored: bool):
+        """
+        Buffers the wanted vote state; ``stored`` is what the database holds right now.
+        """
+        post_votes = self._pending.setdefault(post_id, {})
+        entry = post_votes.pop(user_id, None)
+        if entry is not None:
+            stored = entry[1]
+            self._size -= 1
+        else:
+            flushing = self._flushing.get(post_id, {}).get(user_id)
+            if flushing is not None:
+                # the database holds the flushing state once that commit returns
+                stored = flushing[0]
+
+        if voted != stored:
+            post_votes[user_id] = (voted, stored)
+            self._size += 1
+        if not post_votes:
+            del self._pending[post_id]
+
+        if self._size >= self.flush_size:
+            self._wakeup.set()
+
+    def pending_vote(self, post_id: int, user_id: int) -> Optional[bool]:
+        """
+        The user's not yet flushed vote state for a post, or None if nothing is pending.
+        """
+        entry = self._pending.get(post_id, {}).get(user_id)
+        if entry is None:
+            entry = self._flushing.get(post_id, {}).get(user_id)
+        return entry[0] if entry else None
+
+    def has_pending(self, post_id: int) -> bool:
+        return post_id in self._pending or post_id in self._flushing
+
+    def pending_delta(self, post_id: int) -> int:
+        """
+        How far the stored vote_count is behind the buffered votes for a post.
+        """
+        return sum(
+            1 if voted else -1
+            for batch in (self._flushing, self._pending)
+            for voted, _ in batch.get(post_id, {}).values()
+        )
+
+    async def _write(self, db: AsyncSession, pending: dict) -> Counter:
+        votes, unvotes = [], []
+        for post_id, post_votes in pending.items():
+            for user_id, (voted, _) in post_votes.items():
+                if voted:
+                    votes.append({"post_id": post_id, "user_id": user_id})
+                else:
+                    unvotes.append((post_id, user_id))
+
+        deltas = Counter()
+        for start in range(0, len(votes), self.flush_size):
+            statement = (
+                dialect_insert(db)(Vote)
+                .values(votes[start:start + self.flush_size])
+                .on_conflict_do_nothing(index_elements=["post_id", "user_id"])
+                .returning(Vote.post_id)
+            )
+            deltas.update(await db.scalars(statement))
+
+        for start in range(0, len(unvotes), self.flush_size):
+            statement = (
+                delete(Vote)
+                .where(tuple_(Vote.post_id, Vote.user_id).in_(unvotes[start:start + self.flush_size]))
+                .returning(Vote.post_id)
+            )
+            deltas.subtract(await db.scalars(statement))
+
+        for post_id, delta in deltas.items():
+            if delta:
+                await db.execute(adjust_post_counters(post_id, vote_count=delta))
+        return deltas
+
+    async def _write_one_by_one(self, db: AsyncSession, pending: dict):
+        # a post was deleted after its votes were buffered; keep the rest of the batch
+        for post_id, post_votes in pending.items():
+            for user_id, (voted, _) in post_votes.items():
+                try:
+                    async with db.begin_nested():
+                        if voted:
+                            await cast_vote(db, post_id, user_id)
+                        else:
+                            await retract_vote(db, post_id, user_id)
+                except IntegrityError:
+                    pass
+
+    async def flush(self):
+        """
+        Writes every buffered vote. On failure the entries go back into the buffer.
+        """
+        async with self._lock:
+            pending, self._pending, self._size = self._pending, {}, 0
+            if not pending:
+                return
+            self._flushing = pending
+
+            try:
+                async with self.session_factory() as db:
+                    try:
+                        await self._write(db, pending)
+                        await db.commit()
+                    except IntegrityError:
+                        await db.rollback()
+                        await self._write_one_by_one(db, pending)
+                        await db.commit()
+            except Exception:
+                self._flushing = {}
+                for post_id, post_votes in pending.items():
+                    for user_id, (voted, stored) in post_votes.items():
+                        # a newer action was buffered against this batch, which never landed
+                        newer = self._pending.get(post_id, {})
+                        if user_id in newer:
+                            voted = newer.pop(user_id)[0]
+                            self._size -= 1
+                        self.add(post_id, user_id, voted, stored)
+                raise
+            self._flushing = {}
+
+            self.flushes += 1
+            self.flushed_rows += sum(len(post_votes) for post_votes in pending.values())
+            for post_id in pending:
+                await response_cache.invalidate(post_id)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing %d buffered votes failed", self._size)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops the background flusher and writes whatever is still buffered.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+vote_buffer = VoteBuffer(SessionLocal, VOTE_FLUSH_SIZE, VOTE_FLUSH_INTERVAL)
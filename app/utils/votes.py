@@ -0,0 +1,60 @@
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.post import Post, Vote
+from app.utils.counters import adjust_post_counters
+
+
+def dialect_insert(db: AsyncSession):
+    """
+    Returns the insert() construct with ON CONFLICT support for the session's database.
+    """
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+async def _apply(db: AsyncSession, changed, delta: int) -> Optional[int]:
+    """
+    Runs a vote INSERT/DELETE ... RETURNING post_id and moves the post's counter
+    by ``delta`` if a row changed. On PostgreSQL both happen in one statement via a
+    data-modifying CTE. Returns the new vote_count, or None when nothing changed.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        changed = changed.cte("changed")
+        statement = adjust_post_counters(changed.c.post_id, vote_count=delta)
+        return await db.scalar(statement.returning(Post.vote_count))
+
+    post_id = await db.scalar(changed)
+    if post_id is None:
+        return None
+    statement = adjust_post_counters(post_id, vote_count=delta)
+    return await db.scalar(statement.returning(Post.vote_count))
+
+
+async def cast_vote(db: AsyncSession, post_id: int, user_id: int) -> Optional[int]:
+    """
+    Records a vote, returning the new vote_count or None if the user had already voted.
+
+    A missing post surfaces as an IntegrityError from the votes.post_id foreign key.
+    """
+    inserted = (
+        dialect_insert(db)(Vote)
+        .values(post_id=post_id, user_id=user_id)
+        .on_conflict_do_nothing(index_elements=["post_id", "user_id"])
+        .returning(Vote.post_id)
+    )
+    return await _apply(db, inserted, 1)
+
+
+async def retract_vote(db: AsyncSession, post_id: int, user_id: int) -> Optional[int]:
+    """
+    Removes a vote, returning the new vote_count or None if there was no vote.
+    """
+    deleted = (
+        delete(Vote)
+        .where(Vote.post_id == post_id, Vote.user_id == user_id)
+        .returning(Vote.post_id)
+    )
+    return await _apply(db, deleted, -1)
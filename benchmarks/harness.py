@@ -0,0 +1,283 @@
+"""
+Load-test harness for the post and auth routers.
+
+Seeds a fresh database (SQLite by default, or the PostgreSQL given with
+--database-url), then drives every endpoint in-process through httpx's ASGI
+transport at a fixed concurrency and reports p50/p95/p99 latency, requests per
+second and SQL statements per request for each scenario.
+
+    python -m benchmarks.harness --save baseline.json
+    python -m benchmarks.harness --compare baseline.json   # exit code 1 on regression
+
+The database is dropped and recreated, never point it at real data.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from math import ceil
+
+DEFAULT_DATABASE_URL = "sqlite:///benchmarks/bench.db"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the post and auth endpoints.")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--comments", type=int, default=10000)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="run only scenarios starting with these names")
+    parser.add_argument("--save", help="write the results to this JSON baseline file")
+    parser.add_argument("--compare", help="compare against this JSON baseline file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative p95 latency increase before --compare fails",
+    )
+    return parser.parse_args(argv)
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, ceil(q * len(ordered)) - 1))]
+
+
+def scenarios(ds):
+    """
+    name -> fn(i) returning (method, url, request kwargs) for the i-th request.
+    Writes come after reads and deletes last, each scenario only touches rows that
+    its own requests created or that were reserved for it.
+    """
+    admin = {"token": ds.token(1)}
+
+    def auth(user_id, **params):
+        return {"params": {"token": ds.token(user_id), **params}}
+
+    def user(i):
+        return i % ds.users + 1
+
+    def post(i):
+        return i % ds.posts + 1
+
+    def vote_request(action):
+        def build(i):
+            post_id, user_id = ds.vote_pair(ds.votes + i)
+            return "POST", "/api/v1/posts/vote/", {
+                **auth(user_id),
+                "json": {"post_id": post_id, "action": action},
+            }
+
+        return build
+
+    return {
+        "auth.users": lambda i: ("GET", "/api/v1/auth/users/", {"params": {"page_size": 20}}),
+        "auth.user": lambda i: ("GET", f"/api/v1/auth/users/{user(i)}/", {}),
+        "posts.my_posts": lambda i: ("GET", "/api/v1/posts/my-posts/", auth(user(i))),
+        "posts.list_all": lambda i: ("GET", "/api/v1/posts/list-all/", {"params": admin}),
+        "posts.feed": lambda i: ("GET", "/api/v1/posts/feed/", auth(user(i))),
+        "posts.search": lambda i: (
+            "GET",
+            "/api/v1/posts/search/",
+            auth(user(i), q="python cache", include_comments=True),
+        ),
+        "posts.detail": lambda i: ("GET", f"/api/v1/posts/{post(i)}/detail/", auth(user(i))),
+        "posts.comments": lambda i: ("GET", f"/api/v1/posts/{post(i)}/comments/", {}),
+        "auth.login": lambda i: (
+            "POST",
+            "/api/v1/auth/login/",
+            {"json": {"username": f"user{user(i)}", "password": "benchmark"}},
+        ),
+        "auth.register": lambda i: (
+            "POST",
+            "/api/v1/auth/register/",
+            {"json": {"username": f"new-user-{i}", "password": "benchmark", "role": "regular"}},
+        ),
+        "auth.update_role": lambda i: (
+            "PATCH",
+            f"/api/v1/auth/users/{user(i) % ds.users + 2 if ds.users > 1 else 1}/",
+            {"params": {"role": "regular"}},
+        ),
+        "posts.create": lambda i: (
+            "POST",
+            "/api/v1/posts/create/",
+            {**auth(user(i)), "json": {"title": f"New post {i}", "content": "benchmark"}},
+        ),
+        "posts.bulk_create": lambda i: (
+            "POST",
+            "/api/v1/posts/bulk/",
+            {
+                **auth(user(i)),
+                "json": [{"title": f"Bulk post {i}.{n}", "content": "benchmark"} for n in range(50)],
+            },
+        ),
+        "posts.update": lambda i: (
+            "PUT",
+            f"/api/v1/posts/{post(i)}/",
+            {
+                **auth(ds.post_author(post(i))),
+                "json": {"title": f"Updated post {i}", "content": "benchmark"},
+            },
+        ),
+        "posts.vote": vote_request("vote"),
+        "posts.unvote": vote_request("unvote"),
+        "posts.comment": lambda i: (
+            "POST",
+            f"/api/v1/posts/{post(i)}/comments/",
+            {**auth(user(i)), "json": {"content": f"Comment {i}"}},
+        ),
+        "posts.update_comment": lambda i: (
+            "PUT",
+            f"/api/v1/posts/comments/{ds.comments + i % ds.reserved + 1}/",
+            {**auth(1), "json": {"content": f"Edited {i}"}},
+        ),
+        "posts.delete_comment": lambda i: (
+            "DELETE",
+            f"/api/v1/posts/comments/{ds.comments + i % ds.reserved + 1}/",
+            auth(1),
+        ),
+        "posts.delete": lambda i: (
+            "DELETE",
+            f"/api/v1/posts/{ds.posts + i % ds.reserved + 1}/",
+            auth(1),
+        ),
+        "auth.delete_user": lambda i: (
+            "DELETE",
+            f"/api/v1/auth/users/{ds.users + i % ds.reserved + 1}/",
+            {},
+        ),
+    }
+
+
+async def run_scenario(client, build, requests: int, concurrency: int, statements):
+    latencies, errors = [], 0
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in queue:
+            method, url, kwargs = build(i)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    before = statements["count"]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "statements_per_request": round((statements["count"] - before) / requests, 2),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """
+    Returns the regressions against a baseline: p95 beyond ``tolerance``, more SQL
+    statements per request, or more failed requests.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result["statements_per_request"] > base["statements_per_request"] + 0.01:
+            regressions.append(
+                f"{name}: statements/request {base['statements_per_request']}"
+                f" -> {result['statements_per_request']}"
+            )
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {result['errors']}")
+    return regressions
+
+
+async def main(args):
+    # the app reads its configuration at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    # measure the endpoints, not the load shedding in front of them
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("DB_MAX_IN_FLIGHT", "0")
+
+    import httpx
+    from sqlalchemy import event
+
+    from app.database import SessionLocal, get_engine
+    from app.main import app
+    from benchmarks.seed import Dataset, reset_schema, seed
+
+    engine = get_engine()
+    reserved = args.requests
+    ds = Dataset(args.users, args.posts, args.comments, args.votes, reserved)
+    print(f"Seeding {engine.url.render_as_string()} ...", file=sys.stderr)
+    await reset_schema(engine)
+    await seed(SessionLocal, ds)
+
+    statements = {"count": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*args):
+        statements["count"] += 1
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, build in scenarios(ds).items():
+                if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                    continue
+                results[name] = await run_scenario(
+                    client, build, args.requests, args.concurrency, statements
+                )
+                r = results[name]
+                print(
+                    f"{name:22} p50 {r['p50_ms']:8.2f}ms  p95 {r['p95_ms']:8.2f}ms"
+                    f"  p99 {r['p99_ms']:8.2f}ms  {r['rps']:8.1f} req/s"
+                    f"  {r['statements_per_request']:5.2f} sql/req  {r['errors']} errors"
+                )
+
+    report = {
+        "config": {
+            "database": engine.dialect.name,
+            "users": args.users,
+            "posts": args.posts,
+            "comments": args.comments,
+            "votes": args.votes,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+        regressions = compare(results, baseline["scenarios"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,162 @@
+"""
+Seeds a fresh benchmark database with a deterministic data set.
+
+Ids are assigned in insertion order on empty tables, so scenarios can address
+rows by id: see Dataset for the layout.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app.database import Base
+from app.models.post import Comment, Post, Vote
+from app.models.user import User, UserRole
+from app.utils.auth import create_access_token
+from app.utils.hashing import hash_password
+from app.utils.threads import path_segment
+
+PASSWORD = "benchmark"
+CHUNK = 5000
+
+
+@dataclass
+class Dataset:
+    """
+    users 1..users (user 1 is the admin), posts 1..posts, comments 1..comments and
+    ``votes`` distinct votes, plus ``reserved`` extra users, posts (by user 1) and
+    comments (by user 1 on post 1) for the scenarios that delete them.
+    """
+
+    users: int
+    posts: int
+    comments: int
+    votes: int
+    reserved: int
+    tokens: dict = field(default_factory=dict)
+
+    def post_author(self, post_id: int) -> int:
+        return (post_id - 1) % self.users + 1
+
+    def token(self, user_id: int) -> str:
+        if user_id not in self.tokens:
+            role = "admin" if user_id == 1 else "regular"
+            self.tokens[user_id] = create_access_token(
+                {"sub": f"user{user_id}", "user_id": user_id, "role": role}
+            )
+        return self.tokens[user_id]
+
+    def vote_pair(self, k: int):
+        """The k-th (post_id, user_id) pair; the seeded votes are pairs 0..votes-1."""
+        k %= self.posts * self.users
+        return k % self.posts + 1, k // self.posts + 1
+
+
+def _chunks(rows):
+    for start in range(0, len(rows), CHUNK):
+        yield rows[start:start + CHUNK]
+
+
+async def reset_schema(engine):
+    """
+    Recreates the tables. PostgreSQL is migrated with alembic so that migration-only
+    columns (the search vectors) exist; other databases use create_all.
+    """
+    if engine.dialect.name == "postgresql":
+        from alembic import command
+        from alembic.config import Config
+
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP SCHEMA public CASCADE"))
+            await conn.execute(text("CREATE SCHEMA public"))
+
+        config = Config("alembic.ini")
+        url = engine.url.set(drivername="postgresql+psycopg2")
+        config.set_main_option("sqlalchemy.url", url.render_as_string(hide_password=False))
+        command.upgrade(config, "head")
+        return
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed(session_factory, dataset: Dataset, seed: int = 42):
+    rng = random.Random(seed)
+    now = datetime.now()
+    week = 7 * 24 * 3600
+
+    def moment():
+        return now - timedelta(seconds=rng.randint(0, week))
+
+    password = hash_password(PASSWORD)
+    users = [
+        {
+            "username": f"user{i}",
+            "password": password,
+            "role": UserRole.admin if i == 1 else UserRole.regular,
+            "created_at": moment(),
+        }
+        for i in range(1, dataset.users + dataset.reserved + 1)
+    ]
+
+    votes = [dataset.vote_pair(k) for k in range(min(dataset.votes, dataset.posts * dataset.users))]
+    comments = [
+        ((c - 1) % dataset.posts + 1, (c - 1) % dataset.users + 1)
+        for c in range(1, dataset.comments + 1)
+    ] + [(1, 1)] * dataset.reserved
+
+    vote_counts, comment_counts = {}, {}
+    for post_id, _ in votes:
+        vote_counts[post_id] = vote_counts.get(post_id, 0) + 1
+    for post_id, _ in comments:
+        comment_counts[post_id] = comment_counts.get(post_id, 0) + 1
+
+    posts = []
+    for post_id in range(1, dataset.posts + dataset.reserved + 1):
+        created_at = moment()
+        posts.append(
+            {
+                "title": f"Benchmark post {post_id}",
+                "content": " ".join(rng.choices(WORDS, k=rng.randint(20, 120))),
+                "author_id": dataset.post_author(post_id) if post_id <= dataset.posts else 1,
+                "vote_count": vote_counts.get(post_id, 0),
+                "comment_count": comment_counts.get(post_id, 0),
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+        )
+
+    async with session_factory() as db:
+        for model, rows in (
+            (User, users),
+            (Post, posts),
+            (
+                Comment,
+                [
+                    {
+                        # top level comments, each the root of its own thread; ids are
+                        # handed out in insert order on the fresh schema
+                        "root_id": comment_id,
+                        "path": path_segment(comment_id),
+                        "post_id": post_id,
+                        "author_id": author_id,
+                        "content": " ".join(rng.choices(WORDS, k=rng.randint(5, 30))),
+                        "created_at": moment(),
+                    }
+                    for comment_id, (post_id, author_id) in enumerate(comments, start=1)
+                ],
+            ),
+            (Vote, [{"post_id": post_id, "user_id": user_id} for post_id, user_id in votes]),
+        ):
+            for chunk in _chunks(rows):
+                await db.execute(insert(model), chunk)
+            await db.commit()
+
+
+WORDS = (
+    "python fastapi database index query cursor latency cache vote comment post feed "
+    "search async pool worker request response json stream batch replica thread "
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor"
+).split()
@@ -0,0 +1,97 @@
+"""
+Per-row cost of serialising a 100-row post page, before and after the fast path.
+
+before: ORM entities -> PaginatedPostResponse -> FastAPI validates and serialises
+        it again against response_model
+after:  column rows  -> PaginatedPostResponse -> json_response (serialised once)
+
+Run from the repository root:  python -m benchmarks.serialization [--rows 100]
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models.post import Post
+from app.models.user import User
+from app.schemas.post import PaginatedPostResponse, PostResponse
+from app.utils.pagination import PaginationMeta
+from app.utils.serialization import columns_for, json_response
+
+
+async def seed(session_factory, rows: int):
+    async with session_factory() as db:
+        await db.execute(insert(User).values(id=1, username="bench", password="x"))
+        now = datetime.now()
+        await db.execute(
+            insert(Post),
+            [
+                {
+                    "title": f"Post {i}",
+                    "content": "lorem ipsum dolor sit amet " * 20,
+                    "author_id": 1,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(rows)
+            ],
+        )
+        await db.commit()
+
+
+async def before(session_factory, adapter, rows: int):
+    async with session_factory() as db:
+        posts = (await db.execute(select(Post).limit(rows))).scalars().all()
+        page = PaginatedPostResponse(posts=posts, meta=PaginationMeta())
+        # what FastAPI does with the returned model for response_model
+        return adapter.dump_json(adapter.validate_python(page))
+
+
+async def after(session_factory, rows: int):
+    async with session_factory() as db:
+        posts = (await db.execute(select(*columns_for(PostResponse, Post)).limit(rows))).all()
+        page = PaginatedPostResponse(posts=posts, meta=PaginationMeta())
+        return json_response(page).body
+
+
+async def measure(func, iterations: int, *args):
+    await func(*args)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        body = await func(*args)
+    return (time.perf_counter() - started) / iterations, body
+
+
+async def main(rows: int, iterations: int):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(session_factory, rows)
+
+    adapter = TypeAdapter(PaginatedPostResponse)
+    slow, slow_body = await measure(before, iterations, session_factory, adapter, rows)
+    fast, fast_body = await measure(after, iterations, session_factory, rows)
+    assert slow_body == fast_body, "both paths must produce the same JSON"
+
+    print(f"{rows}-row page, {iterations} iterations")
+    print(f"before: {slow * 1e6 / rows:8.2f} us/row  {slow * 1e3:7.2f} ms/page")
+    print(f"after:  {fast * 1e6 / rows:8.2f} us/row  {fast * 1e3:7.2f} ms/page")
+    print(f"speedup: {slow / fast:.2f}x")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.iterations))
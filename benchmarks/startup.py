@@ -0,0 +1,93 @@
+"""
+Cold-start benchmark for the application.
+
+Each run is a fresh interpreter that imports app.main, runs the lifespan
+startup and serves one request, so the numbers include module imports and the
+first connection. Reports the median of each phase over --runs:
+
+    python -m benchmarks.startup --runs 10 --budget-ms 1500   # exit code 1 over budget
+
+The schema is created with DB_CREATE_ALL in a throwaway SQLite file.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PHASES = ("import", "startup", "first_request", "total")
+
+CHILD = """
+import asyncio, json, time
+
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+import httpx
+
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/api/v1/auth/users/")
+        response.raise_for_status()
+        return ready, time.perf_counter()
+
+
+ready, served = asyncio.run(main())
+print(json.dumps({
+    "import": imported - started,
+    "startup": ready - imported,
+    "first_request": served - ready,
+    "total": served - started,
+}))
+"""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure application cold start.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms", type=float, default=1500, help="fail when the median total exceeds this"
+    )
+    return parser.parse_args(argv)
+
+
+def run_once(workdir: str) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        DB_CREATE_ALL="true",
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        # the first run pays for bytecode compilation, keep it out of the numbers
+        run_once(workdir)
+        runs = [run_once(workdir) for _ in range(args.runs)]
+
+    print(f"{'phase':<16}{'median ms':>12}{'max ms':>10}")
+    for phase in PHASES:
+        samples = [run[phase] * 1000 for run in runs]
+        print(f"{phase:<16}{statistics.median(samples):>12.1f}{max(samples):>10.1f}")
+
+    total = statistics.median(run["total"] for run in runs) * 1000
+    if total > args.budget_ms:
+        print(f"median cold start {total:.0f}ms is over the {args.budget_ms:.0f}ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
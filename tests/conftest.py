@@ -0,0 +1,122 @@
+import os
+import tempfile
+import time
+import uuid
+
+import pytest
+
+# The app reads its settings once, at import: point it at a throwaway SQLite
+# database before anything imports app.config.
+_database_dir = tempfile.mkdtemp(prefix="blog-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir}/app.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ["DB_CREATE_ALL"] = "true"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["VOTE_WRITE_BEHIND"] = "false"
+os.environ["EVENTS_BRIDGE"] = "false"
+os.environ["RESPONSE_CACHE_BACKEND"] = "memory"
+# a route running more statements than its query_budget fails the test
+os.environ["SQL_STRICT"] = "true"
+os.environ.pop("METRICS_MULTIPROC_DIR", None)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(client):
+    """
+    Registers a fresh user and returns their access token. Registration always
+    creates a regular user, any other role is set in the database.
+    """
+    from sqlalchemy import update
+
+    from app.database import SessionLocal
+    from app.models.user import User
+
+    async def set_role(user_id: int, role: str):
+        async with SessionLocal() as db:
+            await db.execute(update(User).where(User.id == user_id).values(role=role))
+            await db.commit()
+
+    def make_user(role: str = "regular") -> str:
+        username = f"user-{uuid.uuid4().hex[:12]}"
+        credentials = {"username": username, "password": "secret"}
+        response = client.post("/api/v1/auth/register/", json={**credentials, "role": role})
+        assert response.status_code == 200, response.text
+        if role != "regular":
+            client.portal.call(set_role, response.json()["id"], role)
+        return client.post("/api/v1/auth/login/", json=credentials).json()["access_token"]
+
+    return make_user
+
+
+class FakeRedis:
+    """
+    The slice of redis.asyncio's client the cache and rate limit backends use,
+    kept in a dict. Values come back as bytes, like a client without
+    decode_responses. ``eval`` runs the rate limiter's TAKE_SCRIPT in Python on
+    ``clock``, which tests move forward by hand.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+        self.clock = 1000.0
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry
+
+    async def get(self, key):
+        self.calls.append(("get", key))
+        entry = self._live(key)
+        return None if entry is None else entry[0]
+
+    async def set(self, key, value, px=None):
+        self.calls.append(("set", key))
+        if isinstance(value, str):
+            value = value.encode()
+        expires_at = None if px is None else time.monotonic() + px / 1000
+        self.data[key] = (value, expires_at)
+
+    async def delete(self, key):
+        self.calls.append(("delete", key))
+        self.data.pop(key, None)
+
+    async def eval(self, script, numkeys, key, burst, rate):
+        from app.utils.ratelimit import TAKE_SCRIPT
+
+        assert script == TAKE_SCRIPT and numkeys == 1
+        self.calls.append(("eval", key))
+        burst, rate, now = float(burst), float(rate), self.clock
+        tokens, updated = self.data.get(key, ((burst, now), None))[0]
+        tokens = min(burst, tokens + max(now - updated, 0) * rate)
+        wait = 0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self.data[key] = ((tokens, now), None)
+        return str(wait).encode()
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
@@ -0,0 +1,35 @@
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import update
+
+from app.config import AUTH_USER_CACHE_TTL
+from app.database import SessionLocal
+from app.models.user import User, UserRole
+from app.utils import cache
+from app.utils.auth import decode_access_token
+
+
+def test_role_changed_by_another_worker_shows_within_the_user_cache_ttl(
+    client, make_user, monkeypatch
+):
+    token = make_user()
+    admin_only = "/api/v1/admin/pool/"
+    assert client.get(admin_only, params={"token": token}).status_code == 403
+
+    async def promote_elsewhere():
+        # another worker's change: this worker's cached user is not dropped
+        async with SessionLocal() as db:
+            await db.execute(
+                update(User)
+                .where(User.id == decode_access_token(token)["user_id"])
+                .values(role=UserRole.admin)
+            )
+            await db.commit()
+
+    client.portal.call(promote_elsewhere)
+    assert client.get(admin_only, params={"token": token}).status_code == 403
+
+    later = time.monotonic() + AUTH_USER_CACHE_TTL + 1
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: later))
+    assert client.get(admin_only, params={"token": token}).status_code == 200
@@ -0,0 +1,96 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from app.schemas.post import PostCreate
+from app.utils import bulk
+from app.utils.bulk import run_bulk
+from app.utils.feed import hot_feed
+
+NDJSON = {"content-type": "application/x-ndjson"}
+
+
+def posts(count: int) -> list:
+    return [{"title": f"bulk {n}", "content": "content"} for n in range(count)]
+
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_MAX_ITEMS", 3)
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+
+
+def test_bulk_create_and_delete_follow_in_the_hot_feed(client, make_user):
+    token = make_user()
+    created = client.post("/api/v1/posts/bulk/", params={"token": token}, json=posts(3)).json()
+    assert created["succeeded"] == 3
+    assert all(post_id in hot_feed._posts for post_id in created["ids"])
+
+    deleted = client.post(
+        "/api/v1/posts/bulk/delete/",
+        params={"token": token},
+        json=[{"id": post_id} for post_id in created["ids"]],
+    ).json()
+    assert deleted["succeeded"] == 3
+    assert not any(post_id in hot_feed._posts for post_id in created["ids"])
+
+
+def test_oversize_json_array_is_refused_before_anything_is_written(
+    client, make_user, small_limits
+):
+    token = make_user()
+    response = client.post("/api/v1/posts/bulk/", params={"token": token}, json=posts(4))
+    assert response.status_code == 413
+
+    mine = client.get("/api/v1/posts/my-posts/", params={"token": token}).json()
+    assert mine["posts"] == []
+
+
+def test_oversize_ndjson_reports_the_items_it_wrote(client, make_user, small_limits):
+    token = make_user()
+    body = "\n".join(json.dumps(post) for post in posts(5))
+    response = client.post(
+        "/api/v1/posts/bulk/", params={"token": token}, content=body, headers=NDJSON
+    )
+    assert response.status_code == 200
+
+    result = response.json()
+    assert result["succeeded"] == 3
+    assert all(result["ids"][:3])
+    assert [error["index"] for error in result["errors"]] == [3]
+
+
+class FailingCommit:
+    async def commit(self):
+        raise DBAPIError("COMMIT", {}, Exception("connection lost"))
+
+    async def rollback(self):
+        pass
+
+
+class JsonRequest:
+    headers = {"content-type": "application/json"}
+
+    def __init__(self, items):
+        self.items = items
+
+    async def body(self):
+        return json.dumps(self.items).encode()
+
+
+@pytest.mark.anyio
+async def test_failed_commit_leaves_the_hot_feed_alone():
+    post_id = 10**9
+    hot_feed.track(post_id, datetime.now(), 0, 0)
+
+    async def delete_post(db, chunk):
+        return {index: post_id for index, _ in chunk}, {post_id: None}
+
+    result = await run_bulk(FailingCommit(), JsonRequest(posts(1)), PostCreate, delete_post)
+
+    assert result.failed == 1
+    assert result.errors[0].detail.startswith("Database error")
+    assert post_id in hot_feed._posts
+    hot_feed.discard(post_id)
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from app.utils.cache import MemoryCacheBackend, RedisCacheBackend, TTLCache
+from app.utils.response_cache import ResponseCache
+
+pytestmark = pytest.mark.anyio
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("short", 1, ttl=0.01)
+    cache.set("long", 2)
+    time.sleep(0.02)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+async def test_redis_backend_prefixes_keys_and_sets_ttl(fake_redis):
+    backend = RedisCacheBackend(fake_redis, ttl=0.05, prefix="test:")
+    await backend.set("key", b"value")
+
+    assert await backend.get("key") == b"value"
+    assert "test:key" in fake_redis.data
+
+    await backend.delete("key")
+    assert await backend.get("key") is None
+
+    await backend.set("key", b"value")
+    time.sleep(0.06)
+    assert await backend.get("key") is None
+
+
+@pytest.fixture(params=["memory", "redis"])
+def response_cache(request, fake_redis):
+    if request.param == "memory":
+        return ResponseCache(MemoryCacheBackend(maxsize=100, ttl=60))
+    return ResponseCache(RedisCacheBackend(fake_redis, ttl=60))
+
+
+async def test_response_cache_round_trip(response_cache):
+    key = await response_cache.key(1, "detail")
+    assert await response_cache.get(key) is None
+
+    etag = await response_cache.set(key, b'{"id":1}')
+    assert await response_cache.key(1, "detail") == key
+    assert await response_cache.get(key) == (etag, b'{"id":1}')
+    assert (response_cache.hits, response_cache.misses) == (1, 1)
+
+
+async def test_response_cache_invalidate_drops_every_page_of_a_post(response_cache):
+    detail = await response_cache.key(1, "detail")
+    comments = await response_cache.key(1, "comments:1")
+    other = await response_cache.key(2, "detail")
+    for key in (detail, comments, other):
+        await response_cache.set(key, b"body")
+
+    await response_cache.invalidate(1)
+
+    assert await response_cache.key(1, "detail") != detail
+    assert await response_cache.get(await response_cache.key(1, "detail")) is None
+    assert await response_cache.get(await response_cache.key(1, "comments:1")) is None
+    assert await response_cache.get(await response_cache.key(2, "detail")) is not None
+
+
+async def test_response_cache_without_backend_is_a_no_op():
+    cache = ResponseCache(None)
+    key = await cache.key(1, "detail")
+
+    assert key is None
+    assert await cache.get(key) is None
+    assert (await cache.set(key, b"body")).startswith('"')
+    await cache.invalidate(1)
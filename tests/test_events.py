@@ -0,0 +1,51 @@
+from app.routers import post as post_routes
+from app.utils.events import event_broker
+
+
+def create_post(client, make_user) -> int:
+    return client.post(
+        "/api/v1/posts/create/",
+        params={"token": make_user()},
+        json={"title": "live", "content": "c"},
+    ).json()["id"]
+
+
+def test_event_published_while_the_snapshot_loads_follows_it(client, make_user, monkeypatch):
+    post_id = create_post(client, make_user)
+    get_engine = post_routes.get_engine
+
+    def publish_then_get_engine():
+        # runs after subscribing and before the snapshot is read
+        event_broker.publish(post_id, "comment", {"id": 1})
+        return get_engine()
+
+    monkeypatch.setattr(post_routes, "get_engine", publish_then_get_engine)
+    subscribers = event_broker.subscriber_count
+
+    async def first_chunks():
+        response = await post_routes.post_events(post_id)
+        body = response.body_iterator
+        try:
+            return [await body.__anext__(), await body.__anext__()]
+        finally:
+            await body.aclose()
+
+    snapshot, events = client.portal.call(first_chunks)
+    assert "event: snapshot" in snapshot
+    assert events == 'event: comment\ndata: {"id":1}\n\n'
+    assert event_broker.subscriber_count == subscribers
+
+
+def test_missing_post_does_not_keep_a_subscriber(client):
+    subscribers = event_broker.subscriber_count
+    assert client.get("/api/v1/posts/999999999/events/").status_code == 404
+    assert event_broker.subscriber_count == subscribers
+
+
+def test_subscribers_past_capacity_get_503(client, make_user, monkeypatch):
+    post_id = create_post(client, make_user)
+    monkeypatch.setattr(event_broker, "max_subscribers", event_broker.subscriber_count)
+
+    response = client.get(f"/api/v1/posts/{post_id}/events/")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
@@ -0,0 +1,30 @@
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.hashing import HashingService
+
+pytestmark = pytest.mark.anyio
+
+
+def broken_pool():
+    raise BrokenProcessPool("a worker died")
+
+
+def bad_hash():
+    raise ValueError("not a hash")
+
+
+async def test_only_successful_hashes_count_as_completed():
+    # no workers: the calls run in the event loop's default thread pool
+    hasher = HashingService(workers=0, max_queue=4, retry_after=1)
+
+    assert await hasher.run(str.upper, "ok") == "OK"
+    with pytest.raises(HTTPException) as refused:
+        await hasher.run(broken_pool)
+    assert refused.value.status_code == 503
+    with pytest.raises(ValueError):
+        await hasher.run(bad_hash)
+
+    assert (hasher.completed, hasher.failed, hasher.in_flight) == (1, 2, 0)
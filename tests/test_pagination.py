@@ -0,0 +1,69 @@
+import base64
+import json
+
+import pytest
+
+
+def cursor(payload: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.fixture
+def seven_posts(client, make_user):
+    """Seven posts of a fresh user, returns (token, ids newest first)."""
+    token = make_user()
+    ids = [
+        client.post(
+            "/api/v1/posts/create/", params={"token": token}, json={"title": f"p{n}", "content": "c"}
+        ).json()["id"]
+        for n in range(7)
+    ]
+    return token, ids[::-1]
+
+
+def my_posts(client, token, **params):
+    response = client.get("/api/v1/posts/my-posts/", params={"token": token, "page_size": 3, **params})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return [post["id"] for post in body["posts"]], body["meta"]
+
+
+def walk(client, token, meta, direction: str):
+    # bounded, so a cursor that stops advancing fails instead of looping forever
+    pages = []
+    for _ in range(5):
+        if not meta[f"{direction}_cursor"]:
+            break
+        ids, meta = my_posts(client, token, cursor=meta[f"{direction}_cursor"])
+        pages.append(ids)
+    return pages, meta
+
+
+def test_cursors_walk_every_page_once_both_ways(client, seven_posts):
+    token, expected = seven_posts
+
+    first, meta = my_posts(client, token)
+    pages, meta = walk(client, token, meta, "next")
+    assert [first, *pages] == [expected[0:3], expected[3:6], expected[6:7]]
+
+    back, _ = walk(client, token, meta, "prev")
+    assert back == [expected[3:6], expected[0:3]]
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"d": "next", "v": ["x", "y"]},
+        {"d": "next", "v": ["2026-01-01T00:00:00", "1"]},
+        {"d": "next", "v": ["2026-01-01T00:00:00", True]},
+        {"d": "next", "v": [1, 1]},
+        {"d": "sideways", "v": ["2026-01-01T00:00:00", 1]},
+    ],
+)
+def test_tampered_cursor_is_refused(client, seven_posts, payload):
+    token, _ = seven_posts
+    response = client.get(
+        "/api/v1/posts/my-posts/", params={"token": token, "cursor": cursor(payload)}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,114 @@
+import json
+
+import anyio
+import pytest
+from sqlalchemy import func, select, update
+
+from app.database import SessionLocal
+from app.models.post import Comment
+from app.models.user import User
+from app.utils.auth import decode_access_token
+from app.utils.purge import UserPurger, _comments, owned_rows
+
+
+def user_id(token: str) -> int:
+    return decode_access_token(token)["user_id"]
+
+
+def test_comments_are_purged_leaves_first_in_bounded_chunks(client, make_user):
+    author, leaving, other = make_user(), make_user(), make_user()
+    post_id = client.post(
+        "/api/v1/posts/create/", params={"token": author}, json={"title": "p", "content": "c"}
+    ).json()["id"]
+
+    def comment(token, content, parent_id=None):
+        return client.post(
+            f"/api/v1/posts/{post_id}/comments/",
+            params={"token": token},
+            json={"content": content, "parent_id": parent_id},
+        ).json()["id"]
+
+    top = comment(author, "top")
+    reply = comment(leaving, "reply", top)
+    below = comment(other, "below", reply)
+    comment(other, "further below", below)
+    comment(other, "beside", reply)
+    comment(other, "unrelated")
+
+    async def purge_comments():
+        async with SessionLocal() as db:
+            owned = await owned_rows(db, user_id(leaving))
+            steps = []
+            while True:
+                removed, posts = await _comments(db, user_id(leaving), 3)
+                if not removed:
+                    break
+                steps.append((removed, posts[post_id]["comment_count"]))
+            await db.commit()
+            top_replies = await db.scalar(select(Comment.reply_count).where(Comment.id == top))
+        return owned, steps, top_replies
+
+    owned, steps, top_replies = client.portal.call(purge_comments)
+    # the reply takes the three comments below it along
+    assert owned == {"posts": 0, "comments": 4, "votes": 0}
+    assert steps == [(3, 3), (1, 2)]
+    assert top_replies == 0
+
+
+def test_hidden_users_are_left_out_of_the_export(client, make_user):
+    admin, hidden = make_user("admin"), make_user()
+
+    async def hide():
+        async with SessionLocal() as db:
+            await db.execute(
+                update(User).where(User.id == user_id(hidden)).values(deleted_at=func.now())
+            )
+            await db.commit()
+
+    client.portal.call(hide)
+    response = client.get("/api/v1/admin/export/users/", params={"token": admin})
+    exported = {json.loads(line)["id"] for line in response.text.splitlines()}
+    assert user_id(admin) in exported
+    assert user_id(hidden) not in exported
+
+
+def test_only_the_author_deletes_a_post(client, make_user):
+    author, stranger = make_user(), make_user()
+    post_id = client.post(
+        "/api/v1/posts/create/", params={"token": author}, json={"title": "mine", "content": "c"}
+    ).json()["id"]
+
+    refused = client.delete(f"/api/v1/posts/{post_id}/", params={"token": stranger})
+    assert refused.status_code == 404
+    assert refused.json()["detail"] == "Post not found or unauthorized"
+    assert client.get(f"/api/v1/posts/{post_id}/detail/", params={"token": author}).status_code == 200
+
+    assert client.delete(f"/api/v1/posts/{post_id}/", params={"token": author}).status_code == 200
+    assert client.get(f"/api/v1/posts/{post_id}/detail/", params={"token": author}).status_code == 404
+
+
+@pytest.mark.anyio
+async def test_failing_purge_does_not_hold_up_the_queue():
+    purged = []
+
+    async def purge(user_id):
+        if user_id == 1:
+            raise RuntimeError("lock timeout")
+        purged.append(user_id)
+
+    purger = UserPurger(session_factory=None, chunk_size=10, pause=0, max_attempts=3)
+    purger.purge = purge
+    purger.schedule(1)
+    purger.schedule(2)
+    purger.schedule(3)
+    purger.start()
+    try:
+        with anyio.fail_after(5):
+            while purger.pending:
+                await anyio.sleep(0.01)
+    finally:
+        await purger.stop()
+
+    assert purged == [2, 3]
+    assert purger.failures == 3
+    assert purger.abandoned == 1
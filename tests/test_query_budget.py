@@ -0,0 +1,35 @@
+import pytest
+
+from app.utils.instrumentation import QueryBudgetExceeded, RequestStats
+
+
+def test_strict_mode_raises_past_the_budget():
+    stats = RequestStats(budget=2)
+    stats.record("SELECT 1", 0.0)
+    stats.record("SELECT 2", 0.0)
+    with pytest.raises(QueryBudgetExceeded):
+        stats.record("SELECT 3", 0.0)
+
+
+@pytest.mark.parametrize("votes_limit", [0, 10])
+def test_post_detail_stays_within_its_budget(client, make_user, votes_limit):
+    token = make_user()
+    params = {"token": token}
+    post = client.post(
+        "/api/v1/posts/create/", params=params, json={"title": "budget", "content": "content"}
+    ).json()
+    for n in range(3):
+        comment = client.post(
+            f"/api/v1/posts/{post['id']}/comments/", params=params, json={"content": f"c{n}"}
+        )
+        assert comment.status_code == 200, comment.text
+    vote = client.post("/api/v1/posts/vote/", params=params, json={"post_id": post["id"], "action": "vote"})
+    assert vote.status_code == 200, vote.text
+
+    # a fresh post is never cached, so this runs every query of the route
+    response = client.get(
+        f"/api/v1/posts/{post['id']}/detail/", params={**params, "votes_limit": votes_limit}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["comment_count"] == 3
+    assert len(response.json()["votes"]) == min(votes_limit, 1)
@@ -0,0 +1,148 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import literal, select, tuple_
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import to_async_url
+from app.database import Base
+from app.models.post import Comment, Post, Vote
+from app.models.user import User
+from app.utils.feed import hot_score_sql
+from app.utils.purge import _below_comments
+from app.utils.threads import first_replies, in_subtree
+
+pytestmark = pytest.mark.anyio
+
+# The router queries that must be served by an index, and whether their ORDER BY
+# must come straight from it (no sort step). Keyset pages are listed with a cursor
+# bound, which is the shape every page after the first one takes. Queries that
+# differ per database are built from the dialect name.
+SINCE = datetime(2026, 1, 1)
+THREAD_TOP = select(Comment.root_id, Comment.path).where(Comment.id == 1).subquery()
+
+QUERIES = {
+    "list_all_posts": (
+        select(Post.id)
+        .where(tuple_(Post.updated_at, Post.id) < tuple_(literal(SINCE), literal(100)))
+        .order_by(Post.updated_at.desc(), Post.id.desc())
+        .limit(11),
+        True,
+    ),
+    "list_user_posts": (
+        select(Post.id)
+        .where(Post.author_id == 1)
+        .order_by(Post.updated_at.desc(), Post.id.desc())
+        .limit(11),
+        True,
+    ),
+    "post_detail_comments": (
+        select(Comment.id)
+        .where(Comment.post_id == 1)
+        .order_by(Comment.created_at.desc(), Comment.id.desc())
+        .limit(11),
+        True,
+    ),
+    "top_comments": (
+        select(Comment.id)
+        .where(Comment.post_id == 1, Comment.parent_id.is_(None))
+        .order_by(Comment.created_at.desc(), Comment.id.desc())
+        .limit(11),
+        True,
+    ),
+    "comment_thread": (
+        select(Comment.id).join(THREAD_TOP, in_subtree(THREAD_TOP.c)).order_by(Comment.path),
+        True,
+    ),
+    "thread_replies": (lambda dialect: first_replies(dialect, [Comment.id], [1, 2], 3), False),
+    "list_users": (
+        select(User.id)
+        .where(User.deleted_at.is_(None))
+        .order_by(User.created_at.desc(), User.id.desc())
+        .limit(11),
+        True,
+    ),
+    "post_detail_votes": (
+        select(Vote.user_id).where(Vote.post_id == 1).order_by(Vote.id.desc()).limit(10),
+        False,
+    ),
+    "user_comments": (select(Comment.id).where(Comment.author_id == 1), False),
+    "user_votes": (select(Vote.id).where(Vote.user_id == 1), False),
+    "purge_comments": (_below_comments(1).order_by(Comment.id.desc()).limit(1000), False),
+    "purging_users": (select(User.id).where(User.deleted_at.is_not(None)), False),
+    "hot_feed_window": (
+        lambda dialect: select(Post.id)
+        .where(Post.created_at >= SINCE)
+        .order_by(hot_score_sql(dialect).desc(), Post.id.desc())
+        .limit(1000),
+        False,
+    ),
+}
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+async def engine(request, tmp_path):
+    if request.param == "sqlite":
+        url = f"sqlite+aiosqlite:///{tmp_path}/plans.db"
+    else:
+        # a scratch database: the tables are created and dropped around each test
+        url = os.getenv("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL is not set")
+        url = to_async_url(url)
+
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+async def explain(engine, statement) -> list:
+    """
+    The plan of ``statement`` as a list of steps: SQLite's EXPLAIN QUERY PLAN
+    lines, or PostgreSQL's node types.
+    """
+    compiled = statement.compile(
+        dialect=engine.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    async with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+            return [row[-1] for row in result]
+
+        # the tables are empty; make the planner take an index whenever it can
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+        plan = result.scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+
+    nodes, stack = [], [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        nodes.append(node["Node Type"])
+        stack.extend(node.get("Plans", []))
+    return nodes
+
+
+@pytest.mark.parametrize("name", QUERIES)
+async def test_router_queries_use_an_index(engine, name):
+    statement, ordered_by_index = QUERIES[name]
+    if callable(statement):
+        statement = statement(engine.dialect.name)
+    plan = await explain(engine, statement)
+
+    if engine.dialect.name == "sqlite":
+        full_scans = [step for step in plan if step.startswith("SCAN") and "USING" not in step]
+        assert not full_scans, plan
+        if ordered_by_index:
+            assert not any("TEMP B-TREE" in step for step in plan), plan
+    else:
+        assert "Seq Scan" not in plan, plan
+        if ordered_by_index:
+            assert not {"Sort", "Incremental Sort"} & set(plan), plan
@@ -0,0 +1,63 @@
+import pytest
+
+from app.utils.ratelimit import RedisRateLimitBackend, parse_rate_limits, rate_limiter
+
+pytestmark = pytest.mark.anyio
+
+LOGIN = {"username": "nobody", "password": "wrong"}
+
+
+class BrokenBackend:
+    async def take(self, key, burst, rate):
+        raise ConnectionError("redis is down")
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("login=10/60, vote=120/60,,bulk=5") == {
+        "login": (10, 60.0),
+        "vote": (120, 60.0),
+        "bulk": (5, 1.0),
+    }
+
+
+async def test_redis_bucket_refills_on_the_server_clock(fake_redis):
+    backend = RedisRateLimitBackend(fake_redis, prefix="test:")
+
+    assert await backend.take("login:ip:1", 2, 1.0) == 0
+    assert await backend.take("login:ip:1", 2, 1.0) == 0
+    assert await backend.take("login:ip:1", 2, 1.0) == pytest.approx(1.0)
+    # another client has a bucket of its own
+    assert await backend.take("login:ip:2", 2, 1.0) == 0
+
+    fake_redis.clock += 1
+    assert await backend.take("login:ip:1", 2, 1.0) == 0
+    assert ("eval", "test:login:ip:1") in fake_redis.calls
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "limits", {"login": (2, 60)})
+
+    def use(backend):
+        monkeypatch.setattr(rate_limiter, "backend", backend)
+
+    return use
+
+
+def test_requests_past_the_limit_get_429(client, fake_redis, limited):
+    limited(RedisRateLimitBackend(fake_redis))
+
+    for _ in range(2):
+        assert client.post("/api/v1/auth/login/", json=LOGIN).status_code != 429
+    response = client.post("/api/v1/auth/login/", json=LOGIN)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+
+
+def test_failing_backend_lets_requests_through(client, limited):
+    limited(BrokenBackend())
+    errors = rate_limiter.errors
+
+    for _ in range(3):
+        assert client.post("/api/v1/auth/login/", json=LOGIN).status_code != 429
+    assert rate_limiter.errors == errors + 3
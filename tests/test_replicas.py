@@ -0,0 +1,106 @@
+import shutil
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.config import ASYNC_DATABASE_URL
+from app.database import db_gate, replicas
+from app.utils import replicas as replica_routing
+from app.utils.response_cache import response_cache
+
+PRIMARY_PATH = ASYNC_DATABASE_URL.partition(":///")[2]
+
+
+@pytest.fixture
+def replica(client, monkeypatch, tmp_path):
+    """
+    Routes reads to a second SQLite file; ``sync()`` copies the primary over it,
+    standing in for replication catching up.
+    """
+    path = tmp_path / "replica.db"
+
+    def sync():
+        client.portal.call(replicas.stop)
+        shutil.copyfile(PRIMARY_PATH, path)
+
+    sync()
+    monkeypatch.setattr(replicas, "urls", [f"sqlite+aiosqlite:///{path}"])
+    yield sync
+    client.portal.call(replicas.stop)
+
+
+def create_post(client, token) -> int:
+    return client.post(
+        "/api/v1/posts/create/", params={"token": token}, json={"title": "t", "content": "c"}
+    ).json()["id"]
+
+
+def detail(client, token, post_id):
+    return client.get(f"/api/v1/posts/{post_id}/detail/", params={"token": token})
+
+
+def test_reads_go_to_the_replica(client, make_user, replica):
+    token = make_user()
+    replica()
+    post_id = create_post(client, token)
+
+    # not replicated yet
+    replica_reads = replicas.replica_reads
+    assert detail(client, token, post_id).status_code == 404
+    assert replicas.replica_reads == replica_reads + 1
+
+    replica()
+    assert detail(client, token, post_id).status_code == 200
+
+
+def test_recent_writers_read_from_the_primary(client, make_user, replica, monkeypatch):
+    token = make_user()
+    replica()
+    post_id = create_post(client, token)
+    monkeypatch.setattr(replica_routing, "client_key", lambda request: "writer")
+    replica_routing._recent_writers.set("writer", True)
+
+    primary_reads = replicas.primary_reads
+    assert detail(client, token, post_id).status_code == 200
+    assert replicas.primary_reads == primary_reads + 1
+
+
+def test_replica_reads_do_not_fill_the_response_cache(client, make_user, replica):
+    token = make_user()
+    post_id = create_post(client, token)
+    replica()
+
+    hits = response_cache.hits
+    assert detail(client, token, post_id).status_code == 200
+    assert detail(client, token, post_id).status_code == 200
+    assert response_cache.hits == hits
+
+
+def test_detail_takes_one_gated_session(client, make_user, replica, monkeypatch):
+    token = make_user()
+    post_id = create_post(client, token)
+    replica()
+    monkeypatch.setattr(db_gate, "limit", 1)
+
+    assert detail(client, token, post_id).status_code == 200
+
+
+def test_user_missing_on_the_replica_is_looked_up_on_the_primary(client, make_user, replica):
+    author = make_user()
+    post_id = create_post(client, author)
+    replica()
+
+    # registered after the replica was synced, and not in the user cache yet
+    assert detail(client, make_user(), post_id).status_code == 200
+
+
+def test_failing_replica_leaves_the_rotation(client, make_user, replica, monkeypatch, tmp_path):
+    token = make_user()
+    post_id = create_post(client, token)
+    monkeypatch.setattr(replicas, "urls", [f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db"])
+
+    failures = replicas.failures
+    with pytest.raises(OperationalError):
+        detail(client, token, post_id)
+    assert replicas.failures == failures + 1
+    assert detail(client, token, post_id).status_code == 200
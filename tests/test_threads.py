@@ -0,0 +1,61 @@
+import pytest
+
+
+def flatten(threads) -> list:
+    """Comment contents in reading order, replies after their parent."""
+    contents = []
+    for thread in threads:
+        contents.append(thread["content"])
+        contents.extend(flatten(thread["replies"]))
+    return contents
+
+
+@pytest.fixture
+def threads(client, make_user):
+    """
+    A post with three threads: "a" with five replies (two nested), "b" with
+    one, "c" with none. Returns (post_id, token).
+    """
+    token = make_user()
+    params = {"token": token}
+    post_id = client.post(
+        "/api/v1/posts/create/", params=params, json={"title": "threads", "content": "c"}
+    ).json()["id"]
+
+    def comment(content, parent_id=None):
+        response = client.post(
+            f"/api/v1/posts/{post_id}/comments/",
+            params=params,
+            json={"content": content, "parent_id": parent_id},
+        )
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+
+    a = comment("a")
+    a1 = comment("a1", a)
+    comment("a1x", a1)
+    comment("a1y", a1)
+    comment("a2", a)
+    comment("a3", a)
+    b = comment("b")
+    comment("b1", b)
+    comment("c")
+    return post_id, token
+
+
+@pytest.mark.parametrize(
+    "replies, expected",
+    [
+        (0, ["c", "b", "a"]),
+        (1, ["c", "b", "b1", "a", "a1"]),
+        (3, ["c", "b", "b1", "a", "a1", "a1x", "a1y"]),
+        (10, ["c", "b", "b1", "a", "a1", "a1x", "a1y", "a2", "a3"]),
+    ],
+)
+def test_each_thread_brings_its_first_replies(client, threads, replies, expected):
+    post_id, token = threads
+    response = client.get(
+        f"/api/v1/posts/{post_id}/comments/", params={"token": token, "replies": replies}
+    )
+    assert response.status_code == 200, response.text
+    assert flatten(response.json()["comments"]) == expected
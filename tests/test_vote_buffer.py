@@ -0,0 +1,140 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models.post import Post, Vote
+from app.routers import post as post_routes
+from app.utils.auth import decode_access_token
+from app.utils.vote_buffer import vote_buffer
+
+
+@pytest.fixture
+def write_behind(client, monkeypatch):
+    """
+    Turns VOTE_WRITE_BEHIND on for the routes; the test flushes the buffer by hand.
+    Returns flush().
+    """
+    monkeypatch.setattr(post_routes, "VOTE_WRITE_BEHIND", True)
+
+    def flush():
+        client.portal.call(vote_buffer.flush)
+
+    flush()
+    yield flush
+    flush()
+
+
+@pytest.fixture
+def post_id(client, make_user):
+    return client.post(
+        "/api/v1/posts/create/", params={"token": make_user()}, json={"title": "v", "content": "c"}
+    ).json()["id"]
+
+
+def vote(client, token, post_id, action="vote"):
+    response = client.post(
+        "/api/v1/posts/vote/", params={"token": token}, json={"post_id": post_id, "action": action}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["vote_count"]
+
+
+def stored(client, post_id):
+    """(vote_count, number of vote rows) in the database."""
+
+    async def read():
+        async with SessionLocal() as db:
+            vote_count = await db.scalar(select(Post.vote_count).where(Post.id == post_id))
+            rows = await db.scalar(select(func.count()).where(Vote.post_id == post_id))
+        return vote_count, rows
+
+    return client.portal.call(read)
+
+
+def test_votes_are_written_in_one_flush(client, make_user, write_behind, post_id):
+    tokens = [make_user() for _ in range(3)]
+    assert [vote(client, token, post_id) for token in tokens] == [1, 2, 3]
+    assert stored(client, post_id) == (0, 0)
+
+    # reads overlay the buffered votes
+    detail = client.get(
+        f"/api/v1/posts/{post_id}/detail/", params={"token": tokens[0], "votes_limit": 10}
+    ).json()
+    assert detail["vote_count"] == 3
+    # only the reader's own buffered vote can be listed before the flush
+    assert [v["user_id"] for v in detail["votes"]] == [decode_access_token(tokens[0])["user_id"]]
+
+    flushes, rows = vote_buffer.flushes, vote_buffer.flushed_rows
+    write_behind()
+    assert stored(client, post_id) == (3, 3)
+    assert (vote_buffer.flushes, vote_buffer.flushed_rows) == (flushes + 1, rows + 3)
+    assert len(vote_buffer) == 0
+
+
+def test_vote_undone_before_the_flush_never_reaches_the_database(
+    client, make_user, write_behind, post_id
+):
+    token = make_user()
+    assert vote(client, token, post_id) == 1
+    assert vote(client, token, post_id, "unvote") == 0
+    assert len(vote_buffer) == 0
+
+    write_behind()
+    assert stored(client, post_id) == (0, 0)
+
+
+def test_buffered_vote_is_refused_twice(client, make_user, write_behind, post_id):
+    token = make_user()
+    vote(client, token, post_id)
+    response = client.post(
+        "/api/v1/posts/vote/", params={"token": token}, json={"post_id": post_id, "action": "vote"}
+    )
+    assert response.status_code == 400
+
+
+def test_action_during_a_flush_is_rebased_on_it(
+    client, make_user, write_behind, post_id, monkeypatch
+):
+    token = make_user()
+    vote(client, token, post_id)
+    user_id = next(iter(vote_buffer._pending[post_id]))
+    write = vote_buffer._write
+    seen = {}
+
+    async def write_then_unvote(db, pending):
+        # the batch stays visible while it is written, and the user undoes the vote
+        seen["vote"] = vote_buffer.pending_vote(post_id, user_id)
+        seen["delta"] = vote_buffer.pending_delta(post_id)
+        vote_buffer.add(post_id, user_id, False, stored=False)
+        seen["after_unvote"] = vote_buffer.pending_delta(post_id)
+        return await write(db, pending)
+
+    monkeypatch.setattr(vote_buffer, "_write", write_then_unvote)
+    write_behind()
+    monkeypatch.setattr(vote_buffer, "_write", write)
+
+    assert seen == {"vote": True, "delta": 1, "after_unvote": 0}
+    assert stored(client, post_id) == (1, 1)
+    # the unvote now stands against the stored vote
+    assert vote_buffer.pending_vote(post_id, user_id) is False
+
+    write_behind()
+    assert stored(client, post_id) == (0, 0)
+
+
+def test_vote_on_a_post_deleted_before_the_flush(client, make_user, write_behind):
+    author, voter = make_user(), make_user()
+    gone, kept = [
+        client.post(
+            "/api/v1/posts/create/", params={"token": author}, json={"title": t, "content": "c"}
+        ).json()["id"]
+        for t in ("gone", "kept")
+    ]
+    vote(client, voter, gone)
+    vote(client, voter, kept)
+    assert client.delete(f"/api/v1/posts/{gone}/", params={"token": author}).status_code == 200
+
+    write_behind()
+    assert stored(client, kept) == (1, 1)
+    assert stored(client, gone) == (None, 0)
+    assert len(vote_buffer) == 0